@@ -0,0 +1,81 @@
+"""
+Builds the 400 response data of ExceptionHandler for a bulk payload of
+invalid items, and compares it with the former recursive normalization.
+
+Usage: python benchmarks/handlers.py [items] [repeat]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+settings.configure()
+django.setup()
+
+from rest_framework.exceptions import ErrorDetail  # noqa: E402
+
+from standards.drf.handlers import ExceptionHandler  # noqa: E402
+
+
+class RecursiveExceptionHandler(ExceptionHandler):
+
+    def get_errors(self, errors, path=None):
+        if isinstance(errors, dict):
+            return {
+                field: self.get_errors(error, field)
+                for field, error in errors.items()
+            }
+        elif isinstance(errors, list):
+            return [self.get_errors(error) for error in errors]
+        else:
+            return self.get_error_block(errors)
+
+
+def make_errors(count):
+    # Every third item is invalid, DRF reports valid ones as `{}`.
+    return {
+        'items': [
+            {
+                'title': [ErrorDetail('This field is required.', code='required')],
+                'props': {
+                    'price': [ErrorDetail('A valid number is required.', code='invalid')],
+                },
+            } if index % 3 == 0 else {}
+            for index in range(count)
+        ],
+    }
+
+
+def make_deep_errors(depth):
+    errors = [ErrorDetail('Invalid.', code='invalid')]
+    for _ in range(depth):
+        errors = {'child': errors}
+    return errors
+
+
+def main(count=10000, repeat=10):
+    errors = make_errors(count)
+    iterative = ExceptionHandler()
+    recursive = RecursiveExceptionHandler()
+    assert iterative.get_errors(errors) == recursive.get_errors(errors)
+
+    for name, handler in (('recursive', recursive), ('iterative', iterative)):
+        seconds = min(timeit.repeat(
+            lambda: handler.get_errors(errors), number=1, repeat=repeat
+        ))
+        print(f'{name:>10}: {seconds * 1000:8.2f} ms')
+
+    deep = make_deep_errors(sys.getrecursionlimit() * 2)
+    iterative.get_errors(deep)
+    try:
+        recursive.get_errors(deep)
+    except RecursionError:
+        print('recursive: RecursionError on deep payload, iterative: ok')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,91 @@
+"""
+Compares the library camelize + orjson baseline with the two-pass
+(camelize, then encode) and single-pass CamelCaseORJSONRenderer paths
+on a large list response.
+
+Usage: python benchmarks/renderers.py [items] [repeat]
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+settings.configure()
+django.setup()
+
+from djangorestframework_camel_case.util import camelize  # noqa: E402
+from drf_orjson_renderer.renderers import ORJSONRenderer  # noqa: E402
+
+from standards.drf.casing import key_cache_info  # noqa: E402
+from standards.drf.renderers import CamelCaseORJSONRenderer  # noqa: E402
+
+
+class LibraryCamelCaseORJSONRenderer(ORJSONRenderer):
+
+    def render(self, data, *args, **kwargs):
+        return super().render(camelize(data), *args, **kwargs)
+
+
+def make_data(count):
+    return {
+        'code': 200,
+        'data': {
+            'items': [
+                OrderedDict([
+                    ('id', index),
+                    ('first_name', f'First {index}'),
+                    ('last_name', f'Last {index}'),
+                    ('email_address', f'user{index}@example.com'),
+                    ('is_active', bool(index % 2)),
+                    ('date_joined', '2020-06-05T10:00:00Z'),
+                    ('profile_info', OrderedDict([
+                        ('phone_number', '+380000000000'),
+                        ('tag_list', ['one_tag', 'two_tag']),
+                    ])),
+                ])
+                for index in range(count)
+            ],
+            'pagination': {'limit': count, 'offset': 0, 'total': count},
+        },
+    }
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main(count=10000, repeat=10):
+    data = make_data(count)
+    baseline = LibraryCamelCaseORJSONRenderer()
+    two_pass = CamelCaseORJSONRenderer()
+    single_pass = CamelCaseORJSONRenderer()
+    single_pass.single_pass = True
+
+    assert baseline.render(data) == two_pass.render(data)
+    assert baseline.render(data) == single_pass.render(data)
+
+    for name, renderer in (
+        ('baseline', baseline),
+        ('two-pass', two_pass),
+        ('single-pass', single_pass),
+    ):
+        seconds = min(timeit.repeat(
+            lambda: renderer.render(data), number=1, repeat=repeat
+        ))
+        peak = peak_memory(lambda: renderer.render(data))
+        print(f'{name:>12}: {seconds * 1000:8.2f} ms  peak {peak / 2 ** 20:7.2f} MiB')
+    print('key cache:', key_cache_info()['camelize'])
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,132 @@
+"""
+Serializes a large list of unsaved model instances with the generic
+ModelSerializer path and with `compiled = True`, with and without
+`camelize_keys`.
+
+Usage: python benchmarks/serializers.py [items] [repeat]
+"""
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+settings.configure(
+    INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth'],
+    USE_TZ=True,
+)
+django.setup()
+
+from django.contrib.auth.models import Permission, User  # noqa: E402
+from django.contrib.contenttypes.models import ContentType  # noqa: E402
+
+from standards.drf.serializers import ModelSerializer  # noqa: E402
+
+
+class UserSerializer(ModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            'id', 'username', 'first_name', 'last_name', 'email',
+            'is_active', 'is_staff', 'date_joined',
+        )
+
+
+class CompiledUserSerializer(UserSerializer):
+    compiled = True
+
+    class Meta(UserSerializer.Meta):
+        pass
+
+
+class PermissionSerializer(ModelSerializer):
+    class Meta:
+        model = Permission
+        fields = ('id', 'name', 'codename', 'content_type')
+
+
+class CompiledPermissionSerializer(PermissionSerializer):
+    compiled = True
+
+    class Meta(PermissionSerializer.Meta):
+        pass
+
+
+def camelized(serializer_class):
+    return type(
+        f'Camelized{serializer_class.__name__}',
+        (serializer_class, ),
+        {'camelize_keys': True, 'Meta': type('Meta', (serializer_class.Meta, ), {})},
+    )
+
+
+def make_users(count):
+    joined = datetime.datetime(2020, 6, 5, 10, tzinfo=datetime.timezone.utc)
+    return [
+        User(
+            id=index,
+            username=f'user{index}',
+            first_name=f'First {index}',
+            last_name=f'Last {index}',
+            email=f'user{index}@example.com',
+            is_active=bool(index % 2),
+            date_joined=joined,
+        )
+        for index in range(count)
+    ]
+
+
+def make_permissions(count):
+    content_type = ContentType(id=1, app_label='app', model='model')
+    return [
+        Permission(
+            id=index,
+            name=f'Can do thing {index}',
+            codename=f'do_thing_{index}',
+            content_type=content_type,
+        )
+        for index in range(count)
+    ]
+
+
+def main(count=10000, repeat=10):
+    for label, rows, generic_class, compiled_class in (
+        ('user', make_users(count), UserSerializer, CompiledUserSerializer),
+        (
+            'permission',
+            make_permissions(count),
+            PermissionSerializer,
+            CompiledPermissionSerializer,
+        ),
+    ):
+        cases = (
+            ('generic', generic_class),
+            ('compiled', compiled_class),
+            ('generic camel', camelized(generic_class)),
+            ('compiled camel', camelized(compiled_class)),
+        )
+        assert (
+            generic_class(rows, many=True).data
+            == compiled_class(rows, many=True).data
+        )
+        assert (
+            cases[2][1](rows, many=True).data
+            == cases[3][1](rows, many=True).data
+        )
+
+        print(f'{label} ({count} rows)')
+        for name, serializer_class in cases:
+            seconds = min(timeit.repeat(
+                lambda: serializer_class(rows, many=True).data,
+                number=1,
+                repeat=repeat,
+            ))
+            print(f'{name:>16}: {seconds * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
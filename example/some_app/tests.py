@@ -1,3 +1,492 @@
+from base64 import urlsafe_b64encode
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+from django.contrib.auth.models import Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.paginator import EmptyPage
 from django.test import TestCase
+from rest_framework import exceptions, serializers
+from rest_framework.pagination import CursorPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from standards.drf.casing import (
+    KEY_CACHE_MAX_LENGTH,
+    camelize_key,
+    clear_key_cache,
+    key_cache_info,
+    underscoreize_key,
+)
+from standards.drf.counts import NoCount
+from standards.drf.handlers import exception_handler
+from standards.drf.pagination import (
+    CountingPaginator,
+    KeysetPagination,
+    keyset_pagination,
+    limitoffset_pagination,
+    pagenumber_pagination,
+)
+from standards.drf.renderers import CamelCaseORJSONRenderer
+from standards.drf.serializers import ModelSerializer, NestedListSerializer
+from standards.drf.views import ListAPIView
+
+
+class BulkNestedListSerializer(NestedListSerializer):
+    bulk = True
+
+
+class PermissionSerializer(ModelSerializer):
+    _delete = serializers.BooleanField(required=False, write_only=True)
+
+    class Meta:
+        model = Permission
+        fields = ('id', '_delete', 'name', 'codename', 'content_type')
+        extra_kwargs = {'id': {'read_only': False, 'required': False}}
+        list_serializer_class = BulkNestedListSerializer
+
+
+class ArchivedPermission(Permission):
+    class Meta:
+        app_label = 'some_app'
+        proxy = True
+
+    def delete(self, *args, **kwargs):
+        self.name = f'Archived {self.name}'
+        self.save(update_fields=['name'])
+
+
+class ArchivedPermissionSerializer(PermissionSerializer):
+    class Meta(PermissionSerializer.Meta):
+        model = ArchivedPermission
+
+
+class BulkNestedListSerializerTest(TestCase):
+    sizes = (5, 50)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.content_type = ContentType.objects.create(
+            app_label='some_app', model='thing'
+        )
+
+    def make_permissions(self, count):
+        return Permission.objects.bulk_create(
+            Permission(
+                name=f'Permission {index}',
+                codename=f'permission_{index}',
+                content_type=self.content_type,
+            )
+            for index in range(count)
+        )
+
+    def write(self, data):
+        serializer = PermissionSerializer(many=True)
+        result = serializer.update(
+            self.content_type.permission_set.all(), data
+        )
+        return serializer, result
+
+    def test_create(self):
+        for size in self.sizes:
+            with self.subTest(size=size):
+                Permission.objects.filter(content_type=self.content_type).delete()
+                data = [
+                    {
+                        'name': f'New {index}',
+                        'codename': f'new_{index}',
+                        'content_type': self.content_type,
+                    }
+                    for index in range(size)
+                ]
+                # Only the insert, nothing to load.
+                with self.assertNumQueries(1):
+                    serializer, result = self.write(data)
+                self.assertEqual(serializer.stats['created'], size)
+                self.assertTrue(all(obj.pk for obj in result))
+
+    def test_update(self):
+        for size in self.sizes:
+            with self.subTest(size=size):
+                Permission.objects.filter(content_type=self.content_type).delete()
+                permissions = self.make_permissions(size)
+                data = [
+                    {'id': obj.pk, 'name': f'Renamed {obj.pk}'}
+                    for obj in permissions
+                ]
+                # Loading the objects and one `bulk_update`.
+                with self.assertNumQueries(2):
+                    serializer, _ = self.write(data)
+                self.assertEqual(serializer.stats['updated'], size)
+                self.assertEqual(
+                    Permission.objects.filter(name__startswith='Renamed').count(),
+                    size,
+                )
+
+    def test_update_unchanged(self):
+        for size in self.sizes:
+            with self.subTest(size=size):
+                Permission.objects.filter(content_type=self.content_type).delete()
+                permissions = self.make_permissions(size)
+                data = [
+                    {'id': obj.pk, 'name': obj.name}
+                    for obj in permissions
+                ]
+                with self.assertNumQueries(1):
+                    serializer, _ = self.write(data)
+                self.assertEqual(serializer.stats['unchanged'], size)
+
+    def test_update_overridden(self):
+        calls = []
+
+        class UpdatingSerializer(PermissionSerializer):
+            def update(self, instance, validated_data):
+                calls.append((instance.pk, validated_data))
+                return instance
+
+            class Meta(PermissionSerializer.Meta):
+                pass
+
+        permission, = self.make_permissions(1)
+        for skip_unchanged in (True, False):
+            with self.subTest(skip_unchanged=skip_unchanged):
+                calls.clear()
+                serializer = UpdatingSerializer(many=True)
+                serializer.skip_unchanged = skip_unchanged
+                serializer.update(
+                    self.content_type.permission_set.all(),
+                    [{'id': permission.pk}],
+                )
+                self.assertEqual(calls, [(permission.pk, {})])
+                self.assertEqual(serializer.stats['updated'], 1)
+
+    def test_delete(self):
+        for size in self.sizes:
+            with self.subTest(size=size):
+                Permission.objects.filter(content_type=self.content_type).delete()
+                permissions = self.make_permissions(size)
+                data = [{'id': obj.pk, '_delete': True} for obj in permissions]
+                # Loading the objects, then one delete collecting the rows
+                # and clearing both many-to-many tables.
+                with self.assertNumQueries(5):
+                    serializer, _ = self.write(data)
+                self.assertEqual(serializer.stats['deleted'], size)
+                self.assertFalse(
+                    Permission.objects.filter(content_type=self.content_type).exists()
+                )
+
+    def test_delete_overridden(self):
+        permissions = self.make_permissions(3)
+        serializer = ArchivedPermissionSerializer(many=True)
+        serializer.update(
+            ArchivedPermission.objects.filter(content_type=self.content_type),
+            [{'id': obj.pk, '_delete': True} for obj in permissions],
+        )
+        self.assertEqual(serializer.stats['deleted'], 3)
+        self.assertEqual(
+            Permission.objects.filter(name__startswith='Archived').count(), 3
+        )
+
+
+class PaginationQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'user{index}') for index in range(25)
+        )
+
+    def paginate(self, pagination_class, **params):
+        pagination = pagination_class()
+        request = Request(APIRequestFactory().get('/', params))
+        rows = pagination.paginate_queryset(
+            User.objects.order_by('pk'), request
+        )
+        info = pagination.get_paginated_response(rows).data['pagination']
+        return rows, info
+
+    def test_limit_offset(self):
+        pagination_class = limitoffset_pagination(default_limit=10)
+        # A page with more rows after it has to count.
+        with self.assertNumQueries(2):
+            rows, info = self.paginate(pagination_class)
+        self.assertEqual((len(rows), info['total']), (10, 25))
+        # A short page tells the total by itself.
+        with self.assertNumQueries(1):
+            rows, info = self.paginate(pagination_class, offset=20)
+        self.assertEqual((len(rows), info['total']), (5, 25))
+        with self.assertNumQueries(1):
+            rows, info = self.paginate(pagination_class, limit=30)
+        self.assertEqual((len(rows), info['total']), (25, 25))
+        # Past the end the total is unknown again.
+        with self.assertNumQueries(2):
+            rows, info = self.paginate(pagination_class, offset=30)
+        self.assertEqual((len(rows), info['total']), (0, 25))
+
+    def test_limit_offset_no_limit(self):
+        with self.assertNumQueries(1):
+            rows, info = self.paginate(limitoffset_pagination())
+        self.assertEqual((len(rows), info['limit'], info['total']), (25, None, 25))
+
+    def test_limit_offset_no_count(self):
+        pagination_class = limitoffset_pagination(
+            default_limit=10, count_strategy=NoCount()
+        )
+        with self.assertNumQueries(1):
+            rows, info = self.paginate(pagination_class)
+        self.assertEqual((len(rows), info['has_more']), (10, True))
+
+    def test_page_number(self):
+        pagination_class = pagenumber_pagination(10)
+        with self.assertNumQueries(2):
+            rows, info = self.paginate(pagination_class)
+        self.assertEqual((len(rows), info['count']), (10, 25))
+        with self.assertNumQueries(1):
+            rows, info = self.paginate(pagination_class, p=3)
+        self.assertEqual((len(rows), info['count']), (5, 25))
+        with self.assertRaises(exceptions.NotFound):
+            self.paginate(pagination_class, p=4)
+
+    def test_orphans(self):
+        paginator = CountingPaginator(User.objects.order_by('pk'), 10, orphans=5)
+        page = paginator.page(2)
+        self.assertEqual((len(page), paginator.num_pages), (15, 2))
+        for number in (3, 10):
+            with self.assertRaises(EmptyPage):
+                paginator.page(number)
+
+
+class ExceptionHandlerConcurrencyTest(TestCase):
+    def handle(self, index):
+        kind = index % 3
+        if kind == 0:
+            exc = exceptions.ValidationError({f'field{index}': ['Bad value.']})
+        elif kind == 1:
+            exc = exceptions.NotFound()
+        else:
+            exc = exceptions.Throttled(wait=index)
+        return index, exception_handler(exc, {})
+
+    def test_mixed_errors(self):
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(self.handle, range(3000)))
+
+        for index, response in results:
+            kind = index % 3
+            error = response.data['errors'][0]
+            if kind == 0:
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(error['message'], 'Invalid input.')
+                self.assertEqual(list(error['state']), [f'field{index}'])
+            elif kind == 1:
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(error['message'], 'Not found.')
+            else:
+                self.assertEqual(response.status_code, 429)
+                self.assertEqual(
+                    error['message'],
+                    f'Expected available in {index} seconds.',
+                )
+            self.assertEqual(response.data['code'], response.status_code)
+
+
+class KeysetPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'user{index}') for index in range(5)
+        )
+
+    def paginate(self, pagination_class, **params):
+        request = Request(APIRequestFactory().get('/', params))
+        return pagination_class().paginate_queryset(User.objects.all(), request)
+
+    def encode(self, data):
+        return urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+    def test_page_size_setting(self):
+        with self.settings(REST_FRAMEWORK={'PAGE_SIZE': 2}):
+            self.assertEqual(len(self.paginate(KeysetPagination)), 2)
+        self.assertIsNone(self.paginate(KeysetPagination))
+
+    def test_tampered_cursor(self):
+        pagination_class = keyset_pagination(2, ordering=('-date_joined', 'pk'))
+        for data in (
+            [0, ['x', 1]],
+            [0, [['x'], 1]],
+            [0, ['2020-01-01T00:00:00', {'x': 1}]],
+            [0, [1]],
+        ):
+            with self.subTest(data=data):
+                with self.assertRaises(exceptions.NotFound):
+                    self.paginate(pagination_class, cursor=self.encode(data))
+
+
+class UserSerializer(ModelSerializer):
+    class Meta:
+        model = User
+        fields = ('id', 'username')
+
+
+class UserListView(ListAPIView):
+    serializer_class = UserSerializer
+    pagination_class = limitoffset_pagination(default_limit=10)
+
+    def get_queryset(self):
+        self.querysets = getattr(self, 'querysets', 0) + 1
+        return User.objects.order_by('pk')
+
+    def list_values(self, *args, **kwargs):
+        self.values_listed = True
+        return super().list_values(*args, **kwargs)
+
+
+class CursorUserListView(UserListView):
+    pagination_class = type(
+        'UserCursorPagination',
+        (CursorPagination, ),
+        {'ordering': '-date_joined', 'page_size': 10},
+    )
+
+
+class ValuesSerializationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'user{index}') for index in range(15)
+        )
+
+    def list(self, view_class, **initkwargs):
+        view = view_class(format_kwarg=None, args=(), kwargs={}, **initkwargs)
+        view.request = view.initialize_request(APIRequestFactory().get('/'))
+        response = view.list(view.request)
+        return view, response
+
+    def test_values_path(self):
+        view, values_response = self.list(UserListView)
+        self.assertTrue(view.values_listed)
+        self.assertEqual(view.querysets, 1)
+        view, response = self.list(UserListView, values_serialization=False)
+        self.assertFalse(hasattr(view, 'values_listed'))
+        self.assertEqual(values_response.data, response.data)
+        self.assertEqual(len(response.data['items']), 10)
+
+    def test_other_paginator(self):
+        view, response = self.list(CursorUserListView)
+        self.assertFalse(hasattr(view, 'values_listed'))
+        self.assertEqual(view.querysets, 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 10)
+
+
+class EmailUserSerializer(UserSerializer):
+    def to_representation(self, instance):
+        ret = super().to_representation(instance)
+        ret['email'] = instance.email
+        return ret
+
+
+class EmailListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        return [
+            {**item, 'email': obj.email}
+            for obj, item in zip(data, super().to_representation(data))
+        ]
+
+
+class ListEmailUserSerializer(UserSerializer):
+    class Meta(UserSerializer.Meta):
+        list_serializer_class = EmailListSerializer
+
+
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'user{index}', email=f'user{index}@example.com')
+            for index in range(5)
+        )
+
+    def test_custom_representation(self):
+        for serializer_class in (EmailUserSerializer, ListEmailUserSerializer):
+            with self.subTest(serializer=serializer_class.__name__):
+                view = ListAPIView.as_view(
+                    queryset=User.objects.order_by('pk'),
+                    serializer_class=serializer_class,
+                    pagination_class=None,
+                )
+                with self.assertNumQueries(1):
+                    response = view(APIRequestFactory().get('/'))
+                items = response.data['data']['items']
+                self.assertEqual(items[0]['email'], 'user0@example.com')
+
+
+class KeyCacheTest(TestCase):
+    def test_long_keys_not_cached(self):
+        clear_key_cache()
+        key = 'some_key' * KEY_CACHE_MAX_LENGTH
+        self.assertEqual(camelize_key(key), 'someKey' * KEY_CACHE_MAX_LENGTH)
+        self.assertEqual(underscoreize_key('someKey' * KEY_CACHE_MAX_LENGTH), key)
+        self.assertEqual(camelize_key('some_key'), 'someKey')
+        self.assertEqual(
+            {name: info['currsize'] for name, info in key_cache_info().items()},
+            {'camelize': 1, 'underscoreize': 0},
+        )
+
+
+class StreamingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'user{index}') for index in range(12)
+        )
+
+    def get(self, streaming, params, **initkwargs):
+        view = ListAPIView.as_view(
+            queryset=User.objects.order_by('pk'),
+            serializer_class=UserSerializer,
+            renderer_classes=[CamelCaseORJSONRenderer],
+            streaming=streaming,
+            streaming_chunk_size=5,
+            **initkwargs
+        )
+        response = view(APIRequestFactory().get('/', params))
+        if streaming:
+            return b''.join(response.streaming_content)
+        return response.render().content
+
+    def test_json(self):
+        for initkwargs in (
+            {'pagination_class': None},
+            {'pagination_class': limitoffset_pagination()},
+            {
+                'pagination_class': limitoffset_pagination(
+                    count_strategy=NoCount()
+                ),
+            },
+        ):
+            for params in ({}, {'offset': 5}, {'offset': 20}):
+                with self.subTest(params=params, **initkwargs):
+                    streamed = json.loads(self.get(True, params, **initkwargs))
+                    self.assertEqual(
+                        streamed,
+                        json.loads(self.get(False, params, **initkwargs)),
+                    )
+
+        streamed = json.loads(self.get(
+            True, {'offset': 5}, pagination_class=limitoffset_pagination()
+        ))
+        self.assertEqual(len(streamed['data']['items']), 7)
+        self.assertEqual(
+            streamed['data']['pagination'],
+            {'limit': None, 'offset': 5, 'total': 12},
+        )
 
-# Create your tests here.
+    def test_ndjson(self):
+        content = self.get(
+            True, {}, pagination_class=None, streaming_format='ndjson'
+        )
+        items = json.loads(self.get(False, {}, pagination_class=None))
+        self.assertEqual(
+            [json.loads(line) for line in content.splitlines()],
+            items['data']['items'],
+        )
@@ -0,0 +1,215 @@
+import datetime
+import re
+import uuid
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict
+
+from django.core.files import File
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from djangorestframework_camel_case.util import (
+    camel_to_underscore,
+    camelize_re,
+    underscore_to_camel,
+)
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+__all__ = (
+    'KEY_CACHE_SIZE',
+    'KEY_CACHE_MAX_LENGTH',
+    'Camelized',
+    'CamelizedDict',
+    'CamelizedReturnDict',
+    'CamelizedKeyMap',
+    'camelize_key',
+    'underscoreize_key',
+    'camelize',
+    'underscoreize',
+    'underscoreize_in_place',
+    'key_cache_info',
+    'clear_key_cache',
+)
+
+# API field names are a small, closed set; the bounds only matter for keys
+# sent by clients, which may be arbitrary. Longer keys aren't cached.
+KEY_CACHE_SIZE = 4096
+KEY_CACHE_MAX_LENGTH = 128
+
+SCALAR_TYPES = frozenset((
+    str, int, float, bool, type(None),
+    Decimal, uuid.UUID,
+    datetime.datetime, datetime.date, datetime.time,
+))
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def _camelize_key(key: str) -> str:
+    return re.sub(camelize_re, underscore_to_camel, key)
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def _underscoreize_key(key: str, no_underscore_before_number: bool) -> str:
+    return camel_to_underscore(
+        key, no_underscore_before_number=no_underscore_before_number
+    )
+
+
+class Camelized:
+    """
+    Marks a dict whose own keys are camelCase already.
+
+    Key conversion is skipped for such dicts; their values are still
+    camelized as usual.
+    """
+
+
+class CamelizedDict(Camelized, dict):
+    pass
+
+
+class CamelizedReturnDict(Camelized, ReturnDict):
+    pass
+
+
+class CamelizedKeyMap(dict):
+    """
+    snake_case -> camelCase mapping, filled on first lookup of each key.
+    """
+
+    def __missing__(self, key):
+        value = self[key] = camelize_key(key)
+        return value
+
+
+def camelize_key(key):
+    if isinstance(key, Promise):
+        key = force_str(key)
+    if isinstance(key, str) and '_' in key:
+        if len(key) > KEY_CACHE_MAX_LENGTH:
+            return _camelize_key.__wrapped__(key)
+        return _camelize_key(key)
+    return key
+
+
+def underscoreize_key(key, **options):
+    if isinstance(key, str):
+        convert = (
+            _underscoreize_key.__wrapped__
+            if len(key) > KEY_CACHE_MAX_LENGTH
+            else _underscoreize_key
+        )
+        return convert(key, bool(options.get('no_underscore_before_number')))
+    return key
+
+
+def camelize(data):
+    """
+    Same result as `djangorestframework_camel_case.util.camelize`,
+    built from plain dicts and lists with cached key conversion.
+    """
+    if type(data) in SCALAR_TYPES:
+        return data
+    if isinstance(data, dict):
+        if isinstance(data, Camelized):
+            return {key: camelize(value) for key, value in data.items()}
+        return {
+            camelize_key(key): camelize(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, Promise):
+        return force_str(data)
+    if isinstance(data, str):
+        return data
+    try:
+        iterator = iter(data)
+    except TypeError:
+        return data
+    return [camelize(item) for item in iterator]
+
+
+def underscoreize(data, **options):
+    """
+    Same result as `djangorestframework_camel_case.util.underscoreize`
+    for parsed JSON data, with cached key conversion.
+    """
+    if type(data) in SCALAR_TYPES:
+        return data
+    if isinstance(data, dict):
+        ignore_fields = options.get('ignore_fields') or ()
+        ignore_keys = options.get('ignore_keys') or ()
+        result = {}
+        for key, value in data.items():
+            new_key = underscoreize_key(key, **options)
+            if key not in ignore_fields and new_key not in ignore_fields:
+                value = underscoreize(value, **options)
+            if key in ignore_keys or new_key in ignore_keys:
+                result[key] = value
+            else:
+                result[new_key] = value
+        return result
+    if isinstance(data, (str, File)):
+        return data
+    try:
+        iterator = iter(data)
+    except TypeError:
+        return data
+    return [underscoreize(item, **options) for item in iterator]
+
+
+def underscoreize_in_place(data, **options):
+    """
+    Same result as `underscoreize` for parsed JSON data (dicts, lists and
+    scalars), but renames keys inside the existing containers instead of
+    building a converted copy. Walks iteratively, so deep payloads don't
+    hit the recursion limit.
+    """
+    ignore_fields = options.get('ignore_fields') or ()
+    ignore_keys = options.get('ignore_keys') or ()
+    stack = [data] if isinstance(data, (dict, list)) else []
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(
+                item for item in node
+                if isinstance(item, (dict, list))
+            )
+            continue
+
+        renamed = False
+        items = []
+        for key, value in node.items():
+            new_key = underscoreize_key(key, **options)
+            if (
+                isinstance(value, (dict, list))
+                and key not in ignore_fields
+                and new_key not in ignore_fields
+            ):
+                stack.append(value)
+            if key in ignore_keys or new_key in ignore_keys:
+                new_key = key
+            renamed = renamed or new_key != key
+            items.append((new_key, value))
+
+        if renamed:
+            node.clear()
+            node.update(items)
+    return data
+
+
+def key_cache_info() -> Dict[str, Dict[str, int]]:
+    """
+    Hit/miss statistics of the key conversion caches.
+    """
+    return {
+        name: cached.cache_info()._asdict()
+        for name, cached in (
+            ('camelize', _camelize_key),
+            ('underscoreize', _underscoreize_key),
+        )
+    }
+
+
+def clear_key_cache():
+    _camelize_key.cache_clear()
+    _underscoreize_key.cache_clear()
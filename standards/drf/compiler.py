@@ -0,0 +1,207 @@
+from keyword import iskeyword
+from typing import Callable, List, Optional, Sequence
+
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.db.models.fields.related_descriptors import ForeignKeyDeferredAttribute
+from django.db.models.query_utils import DeferredAttribute
+
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject, PrimaryKeyRelatedField
+
+from .casing import CamelizedDict
+
+__all__ = (
+    'get_values_columns',
+    'compile_representation',
+    'compile_values_representation',
+)
+
+# Field classes converting values with a plain builtin.
+PRIMITIVE_CONVERTERS = (
+    (serializers.CharField, 'str({value})'),
+    (serializers.IntegerField, 'int({value})'),
+    (serializers.FloatField, 'float({value})'),
+    (serializers.ReadOnlyField, '{value}'),
+)
+
+# Descriptors returning the column value as loaded.
+PLAIN_DESCRIPTORS = (DeferredAttribute, ForeignKeyDeferredAttribute)
+
+
+def get_attname_chain(field, model) -> Optional[List[str]]:
+    """
+    Attribute names to read the field value with, when the source is
+    a concrete column, possibly behind forward relations. `None` if
+    the value has to go through `field.get_attribute`.
+    """
+    if model is None or field.source == '*':
+        return None
+
+    attrs = list(field.source_attrs)
+    chain = []
+    for index, attr in enumerate(attrs):
+        last = index == len(attrs) - 1
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+
+        if not model_field.is_relation:
+            if not last:
+                return None
+            chain.append(model_field.attname)
+        elif last:
+            if not (
+                isinstance(field, PrimaryKeyRelatedField)
+                and field.pk_field is None
+                and field.use_pk_only_optimization()
+            ):
+                return None
+            chain.append(model_field.attname)
+        else:
+            chain.append(model_field.name)
+            model = model_field.related_model
+
+    if all(name.isidentifier() and not iskeyword(name) for name in chain):
+        return chain
+    return None
+
+
+def get_values_columns(fields: Sequence, model) -> Optional[List[str]]:
+    """
+    `values_list` columns for the fields, when every one of them is a
+    column of the model itself. Columns behind relations are left out:
+    a missing related row would read as `None`, not as an error. So are
+    columns with their own descriptor, like `FileField`, whose instance
+    value isn't the raw column value.
+    """
+    columns = []
+    for field in fields:
+        chain = get_attname_chain(field, model)
+        if chain is None or len(chain) != 1:
+            return None
+        descriptor = getattr(model, chain[0], None)
+        if type(descriptor) not in PLAIN_DESCRIPTORS:
+            return None
+        columns.append(chain[0])
+    return columns
+
+
+def get_converter(field, index: int) -> str:
+    if isinstance(field, PrimaryKeyRelatedField):
+        return 'value'
+    for klass, template in PRIMITIVE_CONVERTERS:
+        if (
+            isinstance(field, klass)
+            and type(field).to_representation is klass.to_representation
+        ):
+            return template.format(value='value')
+    if (
+        isinstance(field, serializers.BooleanField)
+        and type(field).to_representation
+        is serializers.BooleanField.to_representation
+    ):
+        return f'value if value.__class__ is bool else f{index}.to_representation(value)'
+    return f'f{index}.to_representation(value)'
+
+
+def compile_representation(
+    fields: Sequence,
+    keys: Sequence[str],
+    model=None,
+    camelized: bool=False,
+) -> Callable:
+    """
+    Builds `make(fields, generic)`, returning a `to_representation(instance)`
+    function specialized for the fields.
+
+    Model columns are read with plain attribute access and primitive
+    conversions are inlined, other fields go through `get_attribute` and
+    `to_representation` as usual. If an inlined read fails, the whole row
+    is produced by `generic(instance)` instead, which handles defaults,
+    `allow_null` and errors the usual way.
+    """
+    lines = [
+        'def make(fields, generic):',
+    ]
+    for index in range(len(fields)):
+        lines.append(f'    f{index} = fields[{index}]')
+    lines += [
+        '    def to_representation(instance):',
+        '        ret = Dict()',
+        '        try:',
+    ]
+    for index, (field, key) in enumerate(zip(fields, keys)):
+        key = repr(key)
+        chain = get_attname_chain(field, model)
+        if chain is None:
+            lines += [
+                '            try:',
+                f'                attribute = f{index}.get_attribute(instance)',
+                '            except SkipField:',
+                '                pass',
+                '            else:',
+                '                if (attribute.pk if isinstance(attribute, PKOnlyObject) else attribute) is None:',
+                f'                    ret[{key}] = None',
+                '                else:',
+                f'                    ret[{key}] = f{index}.to_representation(attribute)',
+            ]
+        else:
+            lines += [
+                f'            value = instance.{".".join(chain)}',
+                f'            ret[{key}] = None if value is None else {get_converter(field, index)}',
+            ]
+    lines += [
+        '        except (AttributeError, KeyError, ObjectDoesNotExist):',
+        '            return generic(instance)',
+        '        return ret',
+        '    return to_representation',
+    ]
+
+    namespace = {
+        'Dict': CamelizedDict if camelized else dict,
+        'ObjectDoesNotExist': ObjectDoesNotExist,
+        'PKOnlyObject': PKOnlyObject,
+        'SkipField': SkipField,
+    }
+    exec(compile('\n'.join(lines), '<compiled representation>', 'exec'), namespace)
+    return namespace['make']
+
+
+def compile_values_representation(
+    fields: Sequence,
+    keys: Sequence[str],
+    camelized: bool=False,
+) -> Callable:
+    """
+    Builds `make(fields)`, returning a function that turns `values_list`
+    rows over `get_values_columns(fields)` into representation dicts.
+    """
+    lines = [
+        'def make(fields):',
+    ]
+    for index in range(len(fields)):
+        lines.append(f'    f{index} = fields[{index}]')
+    lines += [
+        '    def to_representation(rows):',
+        '        result = []',
+        '        for row in rows:',
+        '            ret = Dict()',
+    ]
+    for index, (field, key) in enumerate(zip(fields, keys)):
+        lines += [
+            f'            value = row[{index}]',
+            f'            ret[{key!r}] = None if value is None else {get_converter(field, index)}',
+        ]
+    lines += [
+        '            result.append(ret)',
+        '        return result',
+        '    return to_representation',
+    ]
+
+    namespace = {'Dict': CamelizedDict if camelized else dict}
+    exec(compile('\n'.join(lines), '<compiled values representation>', 'exec'), namespace)
+    return namespace['make']
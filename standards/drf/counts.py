@@ -0,0 +1,112 @@
+from hashlib import md5
+import json
+from typing import Optional
+
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+__all__ = (
+    'ExactCount',
+    'CachedCount',
+    'EstimatedCount',
+    'NoCount',
+)
+
+
+class ExactCount:
+    """
+    Plain `SELECT COUNT(*)`.
+    """
+    # Whether paginators report the total, or only if more rows follow.
+    report_total = True
+
+    def count(self, queryset) -> Optional[int]:
+        try:
+            return queryset.count()
+        except (AttributeError, TypeError):
+            return len(queryset)
+
+
+class CachedCount(ExactCount):
+    """
+    Exact count, cached per (database, SQL, params) for `timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        timeout: int=60,
+        cache_alias: str='default',
+        key_prefix: str='standards:count'
+    ):
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+
+    def get_cache_key(self, queryset) -> Optional[str]:
+        query = getattr(queryset, 'query', None)
+        if query is None:
+            return None
+        try:
+            sql, params = query.sql_with_params()
+        except EmptyResultSet:
+            return None
+        digest = md5(repr((queryset.db, sql, params)).encode()).hexdigest()
+        return f'{self.key_prefix}:{digest}'
+
+    def count(self, queryset) -> Optional[int]:
+        key = self.get_cache_key(queryset)
+        if key is None:
+            return super().count(queryset)
+
+        cache = caches[self.cache_alias]
+        value = cache.get(key)
+        if value is None:
+            value = super().count(queryset)
+            cache.set(key, value, self.timeout)
+        return value
+
+
+class EstimatedCount(ExactCount):
+    """
+    PostgreSQL planner estimate for results above `threshold` rows,
+    exact count below it and on other databases.
+    """
+
+    def __init__(self, threshold: int=10000):
+        self.threshold = threshold
+
+    def estimate(self, queryset) -> Optional[int]:
+        query = getattr(queryset, 'query', None)
+        if query is None:
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        try:
+            sql, params = queryset.order_by().query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def count(self, queryset) -> Optional[int]:
+        estimate = self.estimate(queryset)
+        if estimate is None or estimate < self.threshold:
+            return super().count(queryset)
+        return estimate
+
+
+class NoCount:
+    """
+    Skips counting, paginators report whether more rows follow instead.
+    """
+    report_total = False
+
+    def count(self, queryset) -> Optional[int]:
+        return None
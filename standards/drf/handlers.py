@@ -1,31 +1,53 @@
-from typing import Dict, List, Iterable
+from typing import Callable, Dict, List, Iterable, Optional, Tuple
 
 from django.conf import settings
+from django.core.signals import setting_changed
 from django.utils.module_loading import import_string
-from django.utils.translation import pgettext
+from django.utils.translation import get_language, pgettext_lazy
 
 from rest_framework.views import exception_handler as drf_exception_handler
 
 __all__ = (
+    'LazyContext',
     'ExceptionMessageHandler',
     'default_exception_message_handler',
+    'get_exception_message_handler',
+    'ExceptionContext',
     'ExceptionHandler',
     'exception_handler',
 )
 
+class LazyContext(dict):
+    """
+    Message format context, computing each value on first lookup.
+
+    Used with `str.format_map`, so only keys the message refers to
+    are computed.
+    """
+
+    def __init__(self, resolvers: Dict[str, Callable]):
+        super().__init__()
+        self.resolvers = resolvers
+
+    def __missing__(self, key):
+        value = self[key] = self.resolvers[key]()
+        return value
+
+
 class ExceptionMessageHandler:
     # Code map
-    code_invalid= pgettext('standards', 'Invalid input.')
-    code_parse_error = pgettext('standards', 'Malformed request.')
-    code_authentication_failed = pgettext('standards', 'Incorrect authentication credentials.')
-    code_not_authenticated = pgettext('standards', 'Authentication credentials were not provided.')
-    code_permission_denied = pgettext('standards', 'You do not have permission to perform this action.')
-    code_not_found = pgettext('standards', 'Not found.')
-    code_method_not_allowed = pgettext('standards', 'Method "{method}" not allowed.')
-    code_not_acceptable = pgettext('standards', 'Could not satisfy the request Accept header.')
-    code_unsupported_media_type = pgettext('standards', 'Unsupported media type "{media_type}" in request.')
-    code_throttled = pgettext('standards', 'Expected available in {wait} seconds.')
-    code_error = pgettext('standards', 'A server error occurred.')
+    code_invalid = pgettext_lazy('standards', 'Invalid input.')
+    code_parse_error = pgettext_lazy('standards', 'Malformed request.')
+    code_authentication_failed = pgettext_lazy('standards', 'Incorrect authentication credentials.')
+    code_not_authenticated = pgettext_lazy('standards', 'Authentication credentials were not provided.')
+    code_permission_denied = pgettext_lazy('standards', 'You do not have permission to perform this action.')
+    code_not_found = pgettext_lazy('standards', 'Not found.')
+    code_method_not_allowed = pgettext_lazy('standards', 'Method "{method}" not allowed.')
+    code_not_acceptable = pgettext_lazy('standards', 'Could not satisfy the request Accept header.')
+    code_unsupported_media_type = pgettext_lazy('standards', 'Unsupported media type "{media_type}" in request.')
+    code_request_too_large = pgettext_lazy('standards', 'Request body is too large.')
+    code_throttled = pgettext_lazy('standards', 'Expected available in {wait} seconds.')
+    code_error = pgettext_lazy('standards', 'A server error occurred.')
 
     # Status map
     status_400 = ['invalid', 'parse_error']
@@ -34,15 +56,40 @@ class ExceptionMessageHandler:
     status_404 = ['not_found']
     status_405 = ['method_not_allowed']
     status_406 = ['not_acceptable']
+    status_413 = ['request_too_large']
     status_415 = ['unsupported_media_type']
     status_429 = ['throttled']
     status_500 = ['error']
 
-    def get_code_message(self, code: str):
-        return getattr(self, f'code_{code}', None)
-
-    def get_code_range(self, status: int):
-        return getattr(self, f'status_{status}', None)
+    def get_lookup(self) -> Tuple[Dict[str, str], Dict[int, List[str]]]:
+        """
+        Code -> message and status -> codes tables, translated to the
+        active language. Built once per language.
+        """
+        # Created here, so subclasses with own `__init__` needn't call super.
+        lookups = self.__dict__.setdefault('lookups', {})
+        language = get_language()
+        lookup = lookups.get(language)
+        if lookup is None:
+            lookup = lookups[language] = self.build_lookup()
+        return lookup
+
+    def build_lookup(self) -> Tuple[Dict[str, str], Dict[int, List[str]]]:
+        codes = {}
+        statuses = {}
+        for name in dir(self):
+            if name.startswith('code_'):
+                message = getattr(self, name)
+                codes[name[5:]] = str(message) if message else message
+            elif name.startswith('status_') and name[7:].isdigit():
+                statuses[int(name[7:])] = getattr(self, name)
+        return codes, statuses
+
+    def get_code_message(self, code: str) -> Optional[str]:
+        return self.get_lookup()[0].get(code)
+
+    def get_code_range(self, status: int) -> Optional[List[str]]:
+        return self.get_lookup()[1].get(status)
 
     def __call__(self, status: int, code: str = None, context: Dict={}):
         message = ''
@@ -51,97 +98,149 @@ class ExceptionMessageHandler:
 
         code_rande = self.get_code_range(status)
         if not message and code_rande:
-            message =  self.get_code_message(code_rande[0])
-        return  message.format(**context)
+            message = self.get_code_message(code_rande[0])
+        return (message or '').format_map(context)
 
 default_exception_message_handler = ExceptionMessageHandler()
 
-CONFIGS = getattr(settings, 'REST_FRAMEWORK', {})
-message_handler_path = CONFIGS.get('EXCEPTION_MESSAGE_HANDLER')
-exception_message_handler = (
-    import_string(message_handler_path)
-    if message_handler_path
-    else default_exception_message_handler
-)
+_message_handler_cache = {}
+
+
+def get_exception_message_handler() -> ExceptionMessageHandler:
+    """
+    Message handler configured by REST_FRAMEWORK['EXCEPTION_MESSAGE_HANDLER'].
+
+    Resolved on first use instead of import, and resolved again after
+    the settings change (e.g. with `override_settings`).
+    """
+    handler = _message_handler_cache.get('handler')
+    if handler is None:
+        configs = getattr(settings, 'REST_FRAMEWORK', {})
+        path = configs.get('EXCEPTION_MESSAGE_HANDLER')
+        handler = _message_handler_cache['handler'] = (
+            import_string(path)
+            if path
+            else default_exception_message_handler
+        )
+    return handler
+
+
+def reset_exception_message_handler(*, setting, **kwargs):
+    if setting == 'REST_FRAMEWORK':
+        _message_handler_cache.clear()
+
+
+setting_changed.connect(reset_exception_message_handler)
+
+
+class ExceptionContext:
+    """
+    State of one exception handling call.
+
+    Handlers keep no per-call state on themselves, so a single handler
+    instance is safe to share between threads and coroutines.
+    """
+    __slots__ = ('exc', 'request', 'view', 'response', 'details')
+
+    def __init__(self, exc, request, view, response):
+        self.exc = exc
+        self.request = request
+        self.view = view
+        self.response = response
+        self.details = exc.detail
 
 
 class ExceptionHandler:
+    context_class = ExceptionContext
 
     def __call__(self, exc, context):
-        self.request = context.get('request')
-        self.view = context.get('view')
-        self.response = drf_exception_handler(exc, context)
-        self.exc = exc
-        if self.response is not None and hasattr(exc, 'detail'):
-            self.details = self.exc.detail
-            self.response.data = self.get_response_data()
-        return self.response
-        
-    def get_response_data(self):
+        response = drf_exception_handler(exc, context)
+        if response is not None and hasattr(exc, 'detail'):
+            response.data = self.get_response_data(self.context_class(
+                exc,
+                context.get('request'),
+                context.get('view'),
+                response,
+            ))
+        return response
+
+    def get_response_data(self, context: ExceptionContext):
         data = {}
-        data['code'] = self.response.status_code
-        data['message'] = self.response.status_text
-        errors = self.get_errors(self.details) or []
+        data['code'] = context.response.status_code
+        data['message'] = context.response.status_text
+        errors = self.get_errors(context.details) or []
         if errors:
             data['errors'] = [{
-                'message': self.get_exception_message(errors),
-                'domain': self.get_domain(errors),
-                'reason': self.get_exception_reason(errors),
+                'message': self.get_exception_message(context, errors),
+                'domain': self.get_domain(context, errors),
+                'reason': self.get_exception_reason(context, errors),
                 'state': errors,
             }]
         return data
 
-    def get_exception_message(self, errors: Iterable):
-        return exception_message_handler(
-            self.response.status_code,
-            getattr(self.exc, 'default_code', None),
-            {
-                'method': self.request.method,
-                'media_type': self.request.content_type,
-                'wait': self.get_throttle_duration(),
-            }
+    def get_exception_message(self, context: ExceptionContext, errors: Iterable):
+        return get_exception_message_handler()(
+            context.response.status_code,
+            getattr(context.exc, 'default_code', None),
+            self.get_message_context(context),
         )
 
-    def get_throttle_duration(self):
-        throttle_durations = []
-        for throttle in self.view.get_throttles():
-            if not throttle.allow_request(self.request, self.view):
-                throttle_durations.append(throttle.wait())
-
-        duration = None
-        if throttle_durations:
-            durations = [
-                duration for duration in throttle_durations
-                if duration is not None
-            ]
-            duration = max(durations, default=None)
-        return duration
-
-    def get_domain(self, errors: Iterable) -> str:
+    def get_message_context(self, context: ExceptionContext) -> LazyContext:
+        return LazyContext({
+            'method': lambda: context.request.method,
+            'media_type': lambda: context.request.content_type,
+            'wait': lambda: self.get_throttle_duration(context),
+        })
+
+    def get_throttle_duration(self, context: ExceptionContext):
+        # `Throttled` carries the wait computed by the failed throttle
+        # check, asking the throttles again would record another request.
+        return getattr(context.exc, 'wait', None)
+
+    def get_domain(self, context: ExceptionContext, errors: Iterable) -> str:
         return 'request'
 
-    def get_exception_reason(self, errors: Iterable):
+    def get_exception_reason(self, context: ExceptionContext, errors: Iterable):
         return 'form_value_invalid'
 
     def get_errors(self, errors, path=None) -> List:
-        if isinstance(errors, dict):
-            return self.normalize_dict_errors(errors, path)
-        elif isinstance(errors, list):
-            return self.normalize_list_errors(errors, path)
-        else:
+        """
+        Normalizes the error tree iteratively, so deeply nested payloads
+        can't hit the recursion limit. Empty subtrees, like the `{}`
+        entries of valid list items, are copied without being walked.
+
+        `path` is unused, kept for compatibility with callers passing it.
+        """
+        if not isinstance(errors, (dict, list)):
             return self.get_error_block(errors)
 
-    def normalize_dict_errors(self, errors: Dict, path=None) -> Dict:
-        return {
-            field: self.get_errors(error, field)
-            for field, error in errors.items()
-        }
-
-    def normalize_list_errors(self, errors: List, path=None) -> List:
-        return [
-            self.get_errors(error)
-            for error in errors
-        ]
+        result = self.get_error_node(errors)
+        stack = [(errors, result)]
+        while stack:
+            source, target = stack.pop()
+            if isinstance(source, dict):
+                for field, error in source.items():
+                    node = self.get_error_node(error)
+                    target[field] = node
+                    if error and isinstance(error, (dict, list)):
+                        stack.append((error, node))
+            else:
+                for error in source:
+                    node = self.get_error_node(error)
+                    target.append(node)
+                    if error and isinstance(error, (dict, list)):
+                        stack.append((error, node))
+        return result
+
+    def get_error_node(self, error):
+        """
+        Empty container for a dict or list error, error block otherwise.
+        """
+        if isinstance(error, dict):
+            return {}
+        if isinstance(error, list):
+            return []
+        return self.get_error_block(error)
 
     def get_error_block(self, error) -> Dict:
         return {'message': str(error), 'reason': error.code}
@@ -1,13 +1,62 @@
 from collections import OrderedDict
+from hashlib import md5
+from typing import Callable, Dict, Hashable, List, Optional, Set
 
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet, prefetch_related_objects
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.signals import post_delete, post_save
 from django.http.response import Http404
 from django.utils.encoding import force_str
+from django.utils.translation import get_language
 
 from rest_framework import exceptions, serializers
 from rest_framework.metadata import SimpleMetadata
 from rest_framework.request import clone_request
 
-__all__ = ('FieldsetMetadata', )
+__all__ = (
+    'DEFAULT_MAX_CHOICES',
+    'BulkExtra',
+    'FieldsetMetadata',
+    'CachedFieldsetMetadata',
+    'invalidate_metadata',
+)
+
+DEFAULT_MAX_CHOICES = 100
+
+
+class BulkExtra:
+    """
+    `extra_meta_choices` resolver called once with all choice items,
+    returning values by item id.
+    """
+
+    def __init__(self, resolver: Callable[[List], Dict]):
+        self.resolver = resolver
+
+
+def get_path_relations(model, path: str) -> Optional[List[str]]:
+    """
+    Forward relations to join for reading the column `path` (e.g.
+    'author__name'), or `None` if the path isn't a column.
+    """
+    attrs = path.split(LOOKUP_SEP)
+    relations = []
+    for index, attr in enumerate(attrs):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.many_to_many:
+            return None
+        if index == len(attrs) - 1:
+            return None if field.is_relation else relations
+        if not field.is_relation:
+            return None
+        relations.append(LOOKUP_SEP.join(attrs[:index + 1]))
+        model = field.related_model
 
 
 class FieldsetMetadata(SimpleMetadata):
@@ -47,11 +96,29 @@ class FieldsetMetadata(SimpleMetadata):
                     'some_key2': 'get_some_param'           # will call object method
                     'some_key3': lambda obj: obj.some_attr  # will call lambda with object param
                     'some_key4': self.get_some(obj)         # will call some metod with object param
+                    'some_key5': 'related__some_field'      # will read a column of a related object, in the same query
+                    'some_key6': BulkExtra(lambda objs: {obj.id: ... for obj in objs})  # will be called once with all objects
                 }
             }
     ```
+
+    4) Relational choices are limited to `max_choices` items (defaults to
+    REST_FRAMEWORK['METADATA_MAX_CHOICES'], 100), `choices_truncated`
+    tells whether there are more. Views may declare label fields, read
+    with `values_list`, and endpoints to load choices from instead.
+    Example:
+    ```
+    class SomeView(...):
+        label_meta_choices = {'some_field': 'title'}
+        remote_meta_choices = {
+            'other_field': {'url': '/api/others/', 'search_param': 'search'},
+        }
+    ```
     """
     available_actions = ('GET', 'PATCH', 'POST', 'PUT')
+    # Maximum number of relational choices, `None` for no limit.
+    max_choices = None
+
     def determine_extra(self, request, view):
         return view.get_extra_meta()
 
@@ -73,22 +140,15 @@ class FieldsetMetadata(SimpleMetadata):
                 attrs['choices'] = [
                     {
                         'value': choice_value,
-                        'label': force_text(choice_name)
+                        'label': force_str(choice_name)
                     }
                     for choice_value, choice_name in choices
                 ]
 
-            choice_query = filter_type.extra.get(
-                'queryset', getattr(filter_type, 'queryset', None)
-            )
-            if choice_query:
-                attrs['choices'] = [
-                    {
-                        'value': item.id,
-                        'label': force_text(str(item))
-                    }
-                    for item in choice_query
-                ]
+            choice_query = self.get_filter_queryset(filter_type, request)
+            if choice_query is not None:
+                self.track_queryset(choice_query)
+                attrs.update(self.get_choices_info(choice_query, filter_name))
 
             initial = filter_type.extra.get('initial')
             if not initial is None:
@@ -98,6 +158,7 @@ class FieldsetMetadata(SimpleMetadata):
     
     def determine_metadata(self, request, view):
         self.view = view
+        self.choice_models = set()
         metadata = super().determine_metadata(request, view)
 
         if hasattr(view, 'filterset_class'):
@@ -130,38 +191,335 @@ class FieldsetMetadata(SimpleMetadata):
         if field_info.get('read_only'):
             return field_info
 
-        if hasattr(field, 'choices'):
+        queryset = self.get_field_queryset(field)
+        if queryset is not None:
+            self.track_queryset(queryset)
+            field_info.update(self.get_choices_info(queryset, field.source))
+        elif hasattr(field, 'choices'):
             field_info['choices'] = [
                 {
                     'value': choice_value,
-                    'label': force_text(choice_name),
+                    'label': force_str(choice_name),
                 }
                 for choice_value, choice_name in field.choices.items()
             ]
-        
-        if hasattr(field, 'queryset'):
-            extra_params = (
-                getattr(self.view, 'extra_meta_choices', {})
-                .get(field.source, {})
-            )
+        return field_info
 
-            def get_item_extra(item):
-                extra = {}
-                for name, key in extra_params.items():
-                    value = getattr(item, key, None)
-                    extra[name] = value() if callable(value) else value
-                return extra
+    def get_field_queryset(self, field):
+        """
+        Choices queryset of a serializer field, `None` if it has none.
+        """
+        if isinstance(field, serializers.ManyRelatedField):
+            field = field.child_relation
+        if isinstance(field, serializers.RelatedField):
+            # `choices` of related fields would evaluate the whole queryset.
+            return field.get_queryset()
+        return getattr(field, 'queryset', None)
 
-            queryset = getattr(field, 'queryset', [])
-            if not hasattr(queryset, '__iter__'):
-                queryset = queryset.all()
+    def get_filter_queryset(self, filter_type, request):
+        """
+        Choices queryset of a filter, `None` if it has none.
+        """
+        queryset = filter_type.extra.get(
+            'queryset', getattr(filter_type, 'queryset', None)
+        )
+        if callable(queryset):
+            queryset = queryset(request)
+        return queryset
 
-            field_info['choices'] = [
+    def get_max_choices(self) -> Optional[int]:
+        if self.max_choices is not None:
+            return self.max_choices
+        configs = getattr(settings, 'REST_FRAMEWORK', {})
+        return configs.get('METADATA_MAX_CHOICES', DEFAULT_MAX_CHOICES)
+
+    def get_choices_info(self, queryset, source: str) -> Dict:
+        """
+        `choices` of a queryset, at most `get_max_choices()` of them with
+        `choices_truncated` telling whether there are more, or
+        `choices_remote` if the view declares an endpoint for them.
+        """
+        remote = getattr(self.view, 'remote_meta_choices', {}).get(source)
+        if remote is not None:
+            if isinstance(remote, str):
+                remote = {'url': remote}
+            return {'choices_remote': dict(remote)}
+
+        if not hasattr(queryset, '__iter__'):
+            queryset = queryset.all()
+        limit = self.get_max_choices()
+
+        values_fields = None
+        if hasattr(queryset, 'values_list'):
+            values_fields = self.get_values_fields(queryset.model, source)
+        if values_fields is not None:
+            names = list(values_fields)
+            rows = queryset.values_list('id', *values_fields.values())
+            if limit is not None:
+                rows = rows[:limit + 1]
+            choices = [
                 {
-                    'value': item.id,
-                    'label': force_text(str(item)),
-                    **get_item_extra(item)
+                    'value': row[0],
+                    'label': force_str(row[1]),
+                    **dict(zip(names[1:], row[2:]))
                 }
-                for item in queryset
+                for row in rows
             ]
-        return field_info
+        else:
+            queryset = self.prepare_choices_queryset(queryset, source)
+            if limit is not None:
+                queryset = queryset[:limit + 1]
+            choices = self.serialize_choices(queryset, source)
+
+        info = {'choices': choices}
+        if limit is not None:
+            info['choices_truncated'] = len(choices) > limit
+            del choices[limit:]
+        return info
+
+    def get_label_field(self, source: str) -> Optional[str]:
+        return getattr(self.view, 'label_meta_choices', {}).get(source)
+
+    def get_extra_params(self, source: str) -> Dict:
+        return getattr(self.view, 'extra_meta_choices', {}).get(source, {})
+
+    def get_values_fields(self, model, source: str) -> Optional[Dict[str, str]]:
+        """
+        Columns to read the label and extras with `values_list`, if all of
+        them are columns.
+        """
+        label_field = self.get_label_field(source)
+        if not label_field:
+            return None
+        fields = {'label': label_field}
+        for name, key in self.get_extra_params(source).items():
+            if not isinstance(key, str) or name == 'label':
+                return None
+            fields[name] = key
+        for path in fields.values():
+            if get_path_relations(model, path) is None:
+                return None
+        return fields
+
+    def get_choices_relations(self, model, source: str) -> Set[str]:
+        """
+        Forward relations read by the label and field path extras.
+        """
+        paths = [self.get_label_field(source)] + [
+            key for key in self.get_extra_params(source).values()
+            if isinstance(key, str)
+        ]
+        relations = set()
+        for path in paths:
+            if path and LOOKUP_SEP in path:
+                relations.update(get_path_relations(model, path) or ())
+        return relations
+
+    def prepare_choices_queryset(self, queryset, source: str):
+        """
+        Joins relations the choices read, to a queryset not evaluated yet.
+        """
+        if not isinstance(queryset, QuerySet) or queryset._result_cache is not None:
+            return queryset
+        relations = self.get_choices_relations(queryset.model, source)
+        if relations:
+            queryset = queryset.select_related(*sorted(relations))
+        return queryset
+
+    def serialize_choices(self, items, source: str) -> List[Dict]:
+        """
+        Choice dicts of model instances, with the label and extras the
+        view declares for the field or filter.
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        model = type(items[0])
+        label_field = self.get_label_field(source)
+        extra_params = self.get_extra_params(source)
+        paths = {
+            name for name, key in extra_params.items()
+            if isinstance(key, str)
+            and LOOKUP_SEP in key
+            and get_path_relations(model, key) is not None
+        }
+        relations = self.get_choices_relations(model, source)
+        if relations:
+            # Already joined relations are skipped.
+            prefetch_related_objects(items, *sorted(relations))
+        bulk_values = {
+            name: key.resolver(items)
+            for name, key in extra_params.items()
+            if isinstance(key, BulkExtra)
+        }
+
+        def get_path_value(item, path):
+            value = item
+            for attr in path.split(LOOKUP_SEP):
+                value = getattr(value, attr, None)
+                if value is None:
+                    break
+            return value
+
+        def get_item_extra(item):
+            extra = {}
+            for name, key in extra_params.items():
+                if isinstance(key, BulkExtra):
+                    value = bulk_values[name].get(item.id)
+                elif callable(key):
+                    value = key(item)
+                elif name in paths:
+                    value = get_path_value(item, key)
+                else:
+                    value = getattr(item, key, None)
+                    value = value() if callable(value) else value
+                extra[name] = value
+            return extra
+
+        def get_item_label(item):
+            if not label_field:
+                return force_str(str(item))
+            return force_str(get_path_value(item, label_field))
+
+        return [
+            {
+                'value': item.id,
+                'label': get_item_label(item),
+                **get_item_extra(item)
+            }
+            for item in items
+        ]
+
+    def track_queryset(self, queryset):
+        """
+        Records the model of a choices queryset the metadata depends on.
+        """
+        model = getattr(queryset, 'model', None)
+        if model is not None:
+            self.choice_models.add(model)
+
+
+def get_version_key(key_prefix: str, label: str=None) -> str:
+    if label is None:
+        return f'{key_prefix}:version'
+    return f'{key_prefix}:version:{label}'
+
+
+def bump_version(cache, key: str):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate_metadata(
+    model=None,
+    cache_alias: str='default',
+    key_prefix: str='standards:metadata'
+):
+    """
+    Invalidates cached metadata depending on the model's choices, or all
+    cached metadata if no model is given.
+    """
+    label = model._meta.label if model is not None else None
+    bump_version(caches[cache_alias], get_version_key(key_prefix, label))
+
+
+_watched_models = set()
+
+
+def invalidate_model_metadata(sender, **kwargs):
+    for cache_alias, key_prefix in _watched_models:
+        invalidate_metadata(sender, cache_alias, key_prefix)
+
+
+class CachedFieldsetMetadata(FieldsetMetadata):
+    """
+    FieldsetMetadata, cached in Django's cache framework per view class,
+    allowed methods, language, permission fingerprint, URL kwargs and
+    query string.
+
+    Cached metadata is dropped when `invalidate_metadata()` is called, or
+    when an instance of a model used for choices is saved or deleted.
+    Save signals are connected in each process once it has built metadata
+    for the model; `cache_timeout` bounds staleness for writes made
+    elsewhere, e.g. by management commands.
+
+    Metadata is cached per user by default, since choice querysets and
+    permission checks may depend on the specific user. Views may define
+    `get_metadata_fingerprint(request)` to share it wider, e.g. by role.
+    """
+    cache_alias = 'default'
+    cache_timeout = 300
+    key_prefix = 'standards:metadata'
+
+    def determine_metadata(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return super().determine_metadata(request, view)
+
+        cache = caches[self.cache_alias]
+        cached = cache.get(key)
+        if cached is not None:
+            versions, metadata = cached
+            if self.get_versions(versions) == versions:
+                return metadata
+
+        metadata = super().determine_metadata(request, view)
+        labels = self.watch_models(self.choice_models)
+        cache.set(
+            key,
+            (self.get_versions(dict.fromkeys(labels)), metadata),
+            self.cache_timeout,
+        )
+        return metadata
+
+    def get_cache_key(self, request, view) -> Optional[str]:
+        fingerprint = self.get_permission_fingerprint(request, view)
+        if fingerprint is None:
+            return None
+        view_class = type(view)
+        digest = md5(repr((
+            f'{view_class.__module__}.{view_class.__qualname__}',
+            sorted(view.allowed_methods),
+            get_language(),
+            fingerprint,
+            sorted(view.kwargs.items()),
+            request.GET.urlencode(),
+        )).encode()).hexdigest()
+        return f'{self.key_prefix}:{digest}'
+
+    def get_permission_fingerprint(self, request, view) -> Optional[Hashable]:
+        """
+        What permission checks depend on, or `None` to skip the cache.
+        """
+        if hasattr(view, 'get_metadata_fingerprint'):
+            return view.get_metadata_fingerprint(request)
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return 'anonymous'
+        return ('user', user.pk)
+
+    def get_versions(self, versions: Dict[Optional[str], int]) -> Dict:
+        """
+        Current versions of the global key and the given model labels.
+        """
+        keys = {
+            get_version_key(self.key_prefix, label): label
+            for label in {None, *versions}
+        }
+        current = caches[self.cache_alias].get_many(list(keys))
+        return {label: current.get(key) for key, label in keys.items()}
+
+    def watch_models(self, models: Set) -> Set[str]:
+        _watched_models.add((self.cache_alias, self.key_prefix))
+        for model in models:
+            uid = f'standards.metadata.{model._meta.label}'
+            post_save.connect(
+                invalidate_model_metadata, sender=model, dispatch_uid=uid
+            )
+            post_delete.connect(
+                invalidate_model_metadata, sender=model, dispatch_uid=uid
+            )
+        return {model._meta.label for model in models}
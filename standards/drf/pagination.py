@@ -1,17 +1,64 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from collections import OrderedDict
+import datetime
+from functools import partial
+import json
+from typing import Dict, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model, Q, QuerySet
+from django.db.models.query import ModelIterable
+from django.utils.functional import cached_property
+from django.utils.translation import pgettext_lazy
 
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .counts import ExactCount
 
 __all__ = (
     'PageNumberPagination',
     'pagenumber_pagination',
     'LimitOffsetPagination',
     'limitoffset_pagination',
+    'KeysetPagination',
+    'keyset_pagination',
 )
 
 
+def slice_queryset(queryset, start: int, stop: int=None, deferred_join=False) -> List:
+    """
+    Rows `start:stop` of the queryset as a list.
+
+    With `deferred_join` the slice is taken over primary keys only, which
+    the database can read from an index, and full rows are fetched for
+    those keys afterwards, keeping the original order.
+    """
+    if (
+        not deferred_join
+        or stop is None
+        or not isinstance(queryset, QuerySet)
+        or queryset._iterable_class is not ModelIterable
+    ):
+        return list(queryset[start:stop])
+
+    pks = list(queryset.values_list('pk', flat=True)[start:stop])
+    if not pks:
+        return []
+    objects = {
+        obj.pk: obj
+        for obj in queryset.order_by().filter(pk__in=pks)
+    }
+    return [objects[pk] for pk in pks if pk in objects]
+
+
 class StandardPaginationMixin:
+    # Page over primary keys first, then fetch full rows by key.
+    deferred_join = False
 
     def get_pagination_info(self, data):
         raise NotImplementedError('Method "get_pagination_info" not implemented')
@@ -26,27 +73,125 @@ class StandardPaginationMixin:
         return data.get('items')
 
 
+class CountingPaginator(Paginator):
+    """
+    Django paginator that fetches a page with one extra row first and
+    counts through the count strategy only when the total is asked for
+    and can't be told from the page itself.
+    """
+
+    def __init__(
+        self,
+        *args,
+        count_strategy=None,
+        deferred_join=False,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.count_strategy = count_strategy or ExactCount()
+        self.deferred_join = deferred_join
+        self.has_more = False
+        self.last_number = 1
+
+    @cached_property
+    def count(self):
+        if not self.count_strategy.report_total:
+            return None
+        return self.count_strategy.count(self.object_list)
+
+    @property
+    def num_pages(self):
+        if self.count is None:
+            # Only the pages seen so far are known.
+            return self.last_number + int(self.has_more)
+        return Paginator.num_pages.func(self)
+
+    def validate_number(self, number):
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(
+                pgettext_lazy('standards', 'That page number is not an integer')
+            )
+        if number < 1:
+            raise EmptyPage(
+                pgettext_lazy('standards', 'That page number is less than 1')
+            )
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.orphans and self.count_strategy.report_total:
+            # Orphans need the total up front.
+            if number > self.num_pages:
+                raise EmptyPage(
+                    pgettext_lazy('standards', 'That page contains no results')
+                )
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        rows = slice_queryset(
+            self.object_list,
+            bottom,
+            bottom + self.per_page + 1,
+            self.deferred_join,
+        )
+        if not rows and (number > 1 or not self.allow_empty_first_page):
+            raise EmptyPage(
+                pgettext_lazy('standards', 'That page contains no results')
+            )
+
+        self.last_number = number
+        self.has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not self.has_more and self.count_strategy.report_total:
+            self.count = bottom + len(rows)
+        return self._get_page(rows, number, self)
+
+
 class PageNumberPagination(
     StandardPaginationMixin,
     pagination.PageNumberPagination
 ):
+    count_strategy = ExactCount()
     page_query_param = 'p'
 
+    @property
+    def django_paginator_class(self):
+        return partial(
+            CountingPaginator,
+            count_strategy=self.count_strategy,
+            deferred_join=self.deferred_join,
+        )
+
     def get_pagination_info(self, data):
-        return {
-            'count': self.page.paginator.count,
-            'next': self.get_next_link(),
-            'previous': self.get_previous_link(),
-            'page_size': self.page_size,
-        }
+        paginator = self.page.paginator
+        info = {}
+        if paginator.count is None:
+            info['has_more'] = paginator.has_more
+        else:
+            info['count'] = paginator.count
+        info['next'] = self.get_next_link()
+        info['previous'] = self.get_previous_link()
+        info['page_size'] = self.page_size
+        return info
 
 
-def pagenumber_pagination(page_size: int, page_query_param: str='p', **kwargs):
+def pagenumber_pagination(
+    page_size: int,
+    page_query_param: str='p',
+    count_strategy=None,
+    **kwargs
+):
     class Klass(PageNumberPagination):
         def __init__(self, *base_args, **base_kwargs):
             super().__init__(*base_args, **base_kwargs)
             self.page_size = page_size
             self.page_query_param = page_query_param
+            if count_strategy:
+                self.count_strategy = count_strategy
             for key in kwargs:
                 setattr(self, key, kwargs[key])
     return Klass
@@ -56,38 +201,264 @@ class LimitOffsetPagination(
     StandardPaginationMixin,
     pagination.LimitOffsetPagination
 ):
+    count_strategy = ExactCount()
 
     def get_pagination_info(self, data):
-        return  {
+        info = {
             'limit': self.limit,
             'offset': self.offset,
-            'total': self.count,
         }
+        if self.count is None:
+            info['has_more'] = self.has_more
+        else:
+            info['total'] = self.count
+        return info
+
+    def get_count(self, queryset):
+        return self.count_strategy.count(queryset)
 
     def paginate_queryset(self, queryset, request, view=None):
-        self.count = self.get_count(queryset)
         self.limit = self.get_limit(request)
         self.offset = self.get_offset(request)
         self.request = request
+        self.has_more = False
 
+        # Fetch the page first: a short page tells the total by itself.
         if not self.limit:
-            return list(queryset[self.offset:])
+            rows = list(queryset[self.offset:])
+        else:
+            rows = slice_queryset(
+                queryset,
+                self.offset,
+                self.offset + self.limit + 1,
+                self.deferred_join,
+            )
+            self.has_more = len(rows) > self.limit
+            rows = rows[:self.limit]
+
+        self.count = self.get_page_count(queryset, len(rows))
 
-        if self.count > self.limit and self.template is not None:
+        if (
+            self.limit
+            and self.count is not None
+            and self.count > self.limit
+            and self.template is not None
+        ):
             self.display_page_controls = True
+        return rows
 
-        if self.count == 0 or self.offset > self.count:
-            return []
-        return list(queryset[self.offset:self.offset + self.limit])
+    def get_page_count(self, queryset, rows: int) -> Optional[int]:
+        """
+        Total for the pagination block, told from the page itself when
+        it's the last one.
+        """
+        if not self.count_strategy.report_total:
+            return None
+        if not self.has_more and (rows or not self.offset):
+            return self.offset + rows
+        return self.get_count(queryset)
+
+    def get_streaming_info(self, queryset, request, streamed: int) -> Dict:
+        """
+        Pagination block of the unlimited list of `queryset` streamed
+        with `streamed` rows after the offset.
+        """
+        self.request = request
+        self.limit = None
+        self.offset = self.get_offset(request)
+        self.has_more = False
+        self.count = self.get_page_count(queryset, streamed)
+        return self.get_pagination_info(None)
 
 
-def limitoffset_pagination(default_limit=None, max_limit=None, **kwargs):
+def limitoffset_pagination(
+    default_limit=None,
+    max_limit=None,
+    count_strategy=None,
+    **kwargs
+):
     class Klass(LimitOffsetPagination):
         def __init__(self, *base_args, **base_kwargs):
             super().__init__(*base_args, **base_kwargs)
             self.max_limit = max_limit
             if default_limit:
                 self.default_limit = default_limit
+            if count_strategy:
+                self.count_strategy = count_strategy
             for key in kwargs:
                 setattr(self, key, kwargs[key])
-    return Klass
\ No newline at end of file
+    return Klass
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+
+    def default(self, o):
+        # Keep microseconds, seeking on truncated values repeats rows.
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(StandardPaginationMixin, pagination.BasePagination):
+    """
+    Seeks on the ordering values of the last row instead of OFFSET, so
+    every page costs the same, however deep it is.
+
+    `ordering` should be backed by an index and must not contain nullable
+    fields. The primary key is appended as a tie-breaker, unless the
+    ordering ends with it already. Cursors are opaque strings, returned
+    as `next`/`previous` in the pagination block.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = pgettext_lazy('standards', 'Invalid cursor.')
+    max_page_size = None
+    ordering = '-pk'
+    # `PAGE_SIZE` setting when not set.
+    page_size = None
+    page_size_query_param = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.keys = self.get_keys(queryset)
+        cursor = self.decode_cursor(request)
+        reverse, values = cursor if cursor else (False, None)
+
+        keys = [
+            (name, descending != reverse)
+            for name, descending in self.keys
+        ]
+        queryset = queryset.order_by(*[
+            f'-{name}' if descending else name
+            for name, descending in keys
+        ])
+        if values is not None:
+            try:
+                queryset = queryset.filter(self.get_seek_filter(keys, values))
+            except (TypeError, ValueError, ValidationError):
+                # Values of a tampered cursor not fitting the fields.
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(False, rows[-1])
+            if (has_more and reverse) or (cursor and not reverse):
+                self.previous_cursor = self.encode_cursor(True, rows[0])
+        return rows
+
+    def get_pagination_info(self, data):
+        return {
+            'next': self.next_cursor,
+            'previous': self.previous_cursor,
+            'page_size': self.page_size,
+        }
+
+    def get_page_size(self, request) -> Optional[int]:
+        if self.page_size_query_param:
+            try:
+                return pagination._positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        if self.page_size is None:
+            return api_settings.PAGE_SIZE
+        return self.page_size
+
+    def get_ordering(self) -> Tuple[str]:
+        if isinstance(self.ordering, str):
+            return (self.ordering, )
+        return tuple(self.ordering)
+
+    def get_keys(self, queryset) -> List[Tuple[str, bool]]:
+        """
+        Ordering as (field name, descending) pairs, ending with the
+        primary key.
+        """
+        keys = [
+            (name.lstrip('-'), name.startswith('-'))
+            for name in self.get_ordering()
+        ]
+        pk_names = ('pk', queryset.model._meta.pk.name)
+        if not keys or keys[-1][0] not in pk_names:
+            keys.append(('pk', False))
+        return keys
+
+    def get_seek_filter(self, keys, values) -> Q:
+        """
+        Rows after the given values: (a, b) > (x, y) is expanded into
+        a > x OR (a = x AND b > y), prefixed with a >= x for the index.
+        """
+        if len(values) != len(keys):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(keys, values):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+
+        name, descending = keys[0]
+        lookup = 'lte' if descending else 'gte'
+        return Q(**{f'{name}__{lookup}': values[0]}) & condition
+
+    def get_row_value(self, row, name):
+        value = row
+        for attr in name.split('__'):
+            value = getattr(value, attr)
+        if isinstance(value, Model):
+            value = value.pk
+        return value
+
+    def encode_cursor(self, reverse: bool, row) -> str:
+        values = [self.get_row_value(row, name) for name, _ in self.keys]
+        data = json.dumps(
+            [int(reverse), values],
+            cls=CursorJSONEncoder,
+            separators=(',', ':'),
+        )
+        return urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request) -> Optional[Tuple[bool, List]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            reverse, values = json.loads(data)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list):
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), values
+
+
+def keyset_pagination(
+    page_size: int,
+    ordering='-pk',
+    cursor_query_param: str='cursor',
+    **kwargs
+):
+    class Klass(KeysetPagination):
+        def __init__(self, *base_args, **base_kwargs):
+            super().__init__(*base_args, **base_kwargs)
+            self.page_size = page_size
+            self.ordering = ordering
+            self.cursor_query_param = cursor_query_param
+            for key in kwargs:
+                setattr(self, key, kwargs[key])
+    return Klass
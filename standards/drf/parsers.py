@@ -1,13 +1,66 @@
+import codecs
+import io
+
 from django.conf import settings
+from django.utils.translation import pgettext_lazy
 from djangorestframework_camel_case.parser import CamelCaseJSONParser
-from djangorestframework_camel_case.util import underscoreize
 import orjson
-from rest_framework.exceptions import ParseError
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+
+from .casing import underscoreize_in_place
+
+__all__ = ('RequestEntityTooLarge', 'CamelCaseORJSONParser')
 
-__all__ = ('CamelCaseORJSONParser', )
+
+class RequestEntityTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = pgettext_lazy('standards', 'Request body is too large.')
+    default_code = 'request_too_large'
 
 
 class CamelCaseORJSONParser(CamelCaseJSONParser):
+    # Maximum request body size in bytes, `None` for no limit.
+    # Defaults to REST_FRAMEWORK['JSON_PARSER_MAX_BODY_SIZE'].
+    max_body_size = None
+
+    def get_max_body_size(self, parser_context):
+        if self.max_body_size is not None:
+            return self.max_body_size
+        configs = getattr(settings, 'REST_FRAMEWORK', {})
+        return configs.get('JSON_PARSER_MAX_BODY_SIZE')
+
+    def check_content_length(self, parser_context, max_body_size):
+        request = parser_context.get('request')
+        if request is None:
+            return
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (TypeError, ValueError):
+            return
+        if content_length > max_body_size:
+            raise RequestEntityTooLarge()
+
+    def read(self, stream, max_body_size):
+        """
+        Returns the body as a buffer orjson can parse, without copying it
+        when the stream is already in memory.
+        """
+        if isinstance(stream, io.BytesIO):
+            position = stream.tell()
+            buffer = stream.getbuffer()[position:]
+            if max_body_size is not None and len(buffer) > max_body_size:
+                buffer.release()
+                raise RequestEntityTooLarge()
+            stream.seek(0, io.SEEK_END)
+            return buffer
+
+        if max_body_size is None:
+            return stream.read()
+        data = stream.read(max_body_size + 1)
+        if len(data) > max_body_size:
+            raise RequestEntityTooLarge()
+        return data
 
     def parse(self, stream, media_type=None, parser_context=None):
         """
@@ -26,9 +79,21 @@ class CamelCaseORJSONParser(CamelCaseJSONParser):
         """
         parser_context = parser_context or {}
         encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        max_body_size = self.get_max_body_size(parser_context)
+        if max_body_size is not None:
+            self.check_content_length(parser_context, max_body_size)
 
+        data = self.read(stream, max_body_size)
         try:
-            data = stream.read().decode(encoding)
-            return underscoreize(orjson.loads(data), **self.json_underscoreize)
+            # orjson reads UTF-8 buffers directly, other charsets are
+            # decoded first.
+            if codecs.lookup(encoding).name != 'utf-8':
+                data = bytes(data).decode(encoding)
+            return underscoreize_in_place(
+                orjson.loads(data), **self.json_underscoreize
+            )
         except orjson.JSONDecodeError as exc:
             raise ParseError(f"JSON parse error - {exc}")
+        finally:
+            if isinstance(data, memoryview):
+                data.release()
@@ -0,0 +1,193 @@
+from typing import Iterable, Set
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import OneToOneRel, QuerySet
+from django.db.models.query import ModelIterable
+
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField, SlugRelatedField
+
+from .serializers import EntitySerializerMixin, has_custom_representation
+
+__all__ = (
+    'QueryPlan',
+    'build_query_plan',
+    'get_query_plan',
+)
+
+
+class QueryPlan:
+    """
+    Relations and columns a serializer reads from its instances.
+
+    `complete` is false when some field reads something that can't be
+    told from the field tree (method fields, properties, `str()` of
+    related objects, custom `to_representation`), in which case `only`
+    must not be applied.
+    """
+
+    def __init__(self):
+        self.select_related: Set[str] = set()
+        self.prefetch_related: Set[str] = set()
+        self.only: Set[str] = set()
+        self.complete = True
+
+    def __repr__(self):
+        return (
+            f'<QueryPlan select_related={sorted(self.select_related)} '
+            f'prefetch_related={sorted(self.prefetch_related)} '
+            f'only={sorted(self.only) if self.complete else None}>'
+        )
+
+    def apply(self, queryset, only: bool=True):
+        if (
+            not isinstance(queryset, QuerySet)
+            or queryset._iterable_class is not ModelIterable
+        ):
+            return queryset
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(self.prefetch_related))
+        if (
+            only
+            and self.complete
+            and self.only
+            # Don't override deferrals made by the view itself.
+            and queryset.query.deferred_loading == (frozenset(), True)
+        ):
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def build_query_plan(serializer, model) -> QueryPlan:
+    plan = QueryPlan()
+    _plan_serializer(plan, serializer, model, '', False)
+    return plan
+
+
+def _plan_serializer(plan: QueryPlan, serializer, model, prefix: str, prefetched: bool):
+    if isinstance(serializer, serializers.ListSerializer):
+        if has_custom_representation(serializer):
+            plan.complete = False
+        serializer = serializer.child
+    if has_custom_representation(serializer):
+        # May read any attribute of the instance.
+        plan.complete = False
+
+    if isinstance(serializer, EntitySerializerMixin):
+        if serializer.caption_field:
+            _plan_path(
+                plan, None, model, serializer.caption_field.split('__'),
+                prefix, prefetched,
+            )
+        else:
+            # `str(instance)` may read anything.
+            plan.complete = False
+        for name in serializer.get_caption_select_related():
+            if prefetched:
+                plan.prefetch_related.add(prefix + name)
+            else:
+                plan.select_related.add(prefix + name)
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            plan.complete = False
+        elif field.source == '*':
+            if isinstance(field, serializers.BaseSerializer):
+                _plan_serializer(plan, field, model, prefix, prefetched)
+            else:
+                plan.complete = False
+        else:
+            _plan_path(plan, field, model, field.source_attrs, prefix, prefetched)
+
+
+def _plan_path(
+    plan: QueryPlan,
+    field,
+    model,
+    attrs: Iterable[str],
+    prefix: str,
+    prefetched: bool
+):
+    attrs = list(attrs)
+    for index, attr in enumerate(attrs):
+        last = index == len(attrs) - 1
+        if attr == 'pk':
+            attr = model._meta.pk.name
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            # Property or method.
+            plan.complete = False
+            return
+
+        name = prefix + attr
+        if not model_field.is_relation:
+            if not prefetched:
+                plan.only.add(name)
+            return
+
+        if model_field.many_to_many or model_field.one_to_many:
+            plan.prefetch_related.add(name)
+            prefetched = True
+        elif isinstance(model_field, OneToOneRel):
+            # Reverse one-to-one: joinable, but not restrictable by `only`.
+            plan.complete = False
+            if prefetched:
+                plan.prefetch_related.add(name)
+            else:
+                plan.select_related.add(name)
+        elif not model_field.concrete:
+            # Generic foreign keys and other virtual relations can't be
+            # joined, Django prefetches them.
+            plan.complete = False
+            plan.prefetch_related.add(name)
+            return
+        elif (
+            last
+            and isinstance(field, RelatedField)
+            and field.use_pk_only_optimization()
+        ):
+            # Reads the key column only.
+            if not prefetched:
+                plan.only.add(name)
+            return
+        elif prefetched:
+            plan.prefetch_related.add(name)
+        else:
+            plan.select_related.add(name)
+            plan.only.add(name)
+
+        model = model_field.related_model
+        prefix = name + '__'
+
+    if isinstance(field, serializers.BaseSerializer):
+        _plan_serializer(plan, field, model, prefix, prefetched)
+        return
+
+    if isinstance(field, ManyRelatedField):
+        field = field.child_relation
+        if field.use_pk_only_optimization():
+            return
+    if isinstance(field, SlugRelatedField):
+        _plan_path(plan, None, model, field.slug_field.split('__'), prefix, prefetched)
+    else:
+        # Related object rendered as a whole, e.g. with `str()`.
+        plan.complete = False
+
+
+_query_plans = {}
+
+
+def get_query_plan(serializer, model) -> QueryPlan:
+    """
+    Query plan for the serializer class and model, built once.
+    """
+    key = (type(serializer), model)
+    plan = _query_plans.get(key)
+    if plan is None:
+        plan = _query_plans[key] = build_query_plan(serializer, model)
+    return plan
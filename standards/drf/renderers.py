@@ -1,10 +1,109 @@
-from djangorestframework_camel_case.util import camelize
 from drf_orjson_renderer.renderers import ORJSONRenderer
+import orjson
 
-__all__ = ('CamelCaseORJSONRenderer', )
+from .casing import Camelized, camelize, camelize_key
+
+__all__ = ('CamelCaseORJSONRenderer', 'SinglePassCamelCaseORJSONRenderer')
+
+
+class CamelizingEncoder:
+    """
+    Converts dict keys to camelCase while encoding, in one walk.
+
+    Large lists are encoded in batches, so only one batch of camelized
+    items is alive at a time instead of a camelized copy of the whole
+    tree. Output is byte-identical to `orjson.dumps(camelize(data))`
+    with the same `default` and compact `option` flags.
+    """
+    batch_size = 100
+
+    def __init__(self, default, option):
+        self.default = default
+        self.option = option
+
+    def encode(self, data) -> bytes:
+        chunks = []
+        self.write(data, chunks)
+        return b''.join(chunks)
+
+    def dumps(self, value) -> bytes:
+        return orjson.dumps(value, default=self.default, option=self.option)
+
+    def dumps_key(self, key) -> bytes:
+        if isinstance(key, str):
+            return orjson.dumps(key)
+        # Let orjson decide how (and whether) non-str keys are encoded.
+        return self.dumps({key: None})[1:-6]
+
+    def is_large(self, value) -> bool:
+        return (
+            isinstance(value, (list, tuple))
+            and len(value) > self.batch_size
+        )
+
+    def write(self, value, chunks):
+        if isinstance(value, dict):
+            self.write_dict(value, chunks)
+        elif self.is_large(value):
+            self.write_list(value, chunks)
+        else:
+            chunks.append(self.dumps(camelize(value)))
+
+    def write_dict(self, value, chunks):
+        # Renaming the level first keeps camelize's semantics for keys
+        # colliding after conversion; nested values are not copied.
+        if not isinstance(value, Camelized):
+            value = {camelize_key(key): item for key, item in value.items()}
+        chunks.append(b'{')
+        first = True
+        for key, item in value.items():
+            if first:
+                first = False
+            else:
+                chunks.append(b',')
+            chunks.append(self.dumps_key(key))
+            chunks.append(b':')
+            self.write(item, chunks)
+        chunks.append(b'}')
+
+    def write_list(self, value, chunks):
+        chunks.append(b'[')
+        size = self.batch_size
+        for start in range(0, len(value), size):
+            if start:
+                chunks.append(b',')
+            batch = self.dumps([
+                camelize(item) for item in value[start:start + size]
+            ])
+            chunks.append(batch[1:-1])
+        chunks.append(b']')
 
 
 class CamelCaseORJSONRenderer(ORJSONRenderer):
+    # Convert keys while encoding instead of camelizing a copy of the data.
+    # Falls back to the two-pass path for pretty-printed and sorted output.
+    single_pass = False
+    single_pass_excluded_options = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+
+    def render(self, data, media_type=None, renderer_context=None):
+        if self.single_pass and data is not None:
+            renderer_context = renderer_context or {}
+            options = self.options
+            if media_type and self.html_media_type in media_type:
+                options |= orjson.OPT_INDENT_2
+
+            if not options & self.single_pass_excluded_options:
+                default = (
+                    renderer_context['default_function']
+                    if 'default_function' in renderer_context
+                    else self.default
+                )
+                return CamelizingEncoder(default, options).encode(data)
+
+        return super().render(
+            camelize(data), media_type, renderer_context
+        )
+
 
-    def render(self, data, *args, **kwargs):
-        return super().render(camelize(data), *args, **kwargs)
+class SinglePassCamelCaseORJSONRenderer(CamelCaseORJSONRenderer):
+    single_pass = True
@@ -1,6 +1,27 @@
-from collections import OrderedDict
+from typing import Dict, List, Set, Tuple
 
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files import File
+from django.db.models import Manager, Model, QuerySet
+from django.db.models.fields.files import FieldFile
+from django.utils.functional import cached_property
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.serializers import raise_errors_on_nested_writes
+from rest_framework.utils import model_meta
+
+from .casing import (
+    CamelizedDict,
+    CamelizedKeyMap,
+    CamelizedReturnDict,
+    camelize_key,
+)
+from .compiler import (
+    compile_representation,
+    compile_values_representation,
+    get_values_columns,
+)
 
 __all__ = (
     'StandardSerializerMixin',
@@ -13,11 +34,117 @@ __all__ = (
 
 
 class StandardSerializerMixin:
-    
+    # Emit camelCase keys from `to_representation`, so renderers
+    # don't have to convert them per request.
+    camelize_keys = False
+    # Serialize with a function generated once per class for the field
+    # set, for read-heavy endpoints. Fields must not depend on the row.
+    compiled = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.compiled_representations = {}
+        cls.values_representations = {}
+        field_names = list(getattr(cls, '_declared_fields', ()))
+        meta_fields = getattr(getattr(cls, 'Meta', None), 'fields', None)
+        if isinstance(meta_fields, (list, tuple)):
+            field_names.extend(meta_fields)
+        cls.camelized_field_names = CamelizedKeyMap(
+            (field_name, camelize_key(field_name))
+            for field_name in field_names
+        )
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.request = self.context.get('request')
 
+    @property
+    def data(self):
+        data = super().data
+        if isinstance(getattr(self, '_data', None), CamelizedDict):
+            return CamelizedReturnDict(data, serializer=self)
+        return data
+
+    def to_representation(self, instance):
+        if self.compiled:
+            return self.get_compiled_representation()(instance)
+        return self.get_representation(instance)
+
+    def get_compiled_representation(self):
+        function = self.__dict__.get('compiled_representation')
+        if function is None:
+            fields = tuple(self._readable_fields)
+            names = tuple(field.field_name for field in fields)
+            make = self.compiled_representations.get(names)
+            if make is None:
+                keys = (
+                    [self.camelized_field_names[name] for name in names]
+                    if self.camelize_keys
+                    else names
+                )
+                make = self.compiled_representations[names] = (
+                    compile_representation(
+                        fields,
+                        keys,
+                        getattr(getattr(self, 'Meta', None), 'model', None),
+                        self.camelize_keys,
+                    )
+                )
+            function = self.compiled_representation = make(
+                fields, self.get_representation
+            )
+        return function
+
+    def get_values_representation(self):
+        """
+        `(columns, to_representation)` to serialize `values_list` rows over
+        the columns with, or `None` if some field isn't a model column.
+        """
+        fields = tuple(self._readable_fields)
+        names = tuple(field.field_name for field in fields)
+        cached = self.values_representations.get(names)
+        if cached is None:
+            model = getattr(getattr(self, 'Meta', None), 'model', None)
+            columns = get_values_columns(fields, model)
+            make = None
+            if columns:
+                keys = (
+                    [self.camelized_field_names[name] for name in names]
+                    if self.camelize_keys
+                    else names
+                )
+                make = compile_values_representation(
+                    fields, keys, self.camelize_keys
+                )
+            cached = self.values_representations[names] = (columns, make)
+
+        columns, make = cached
+        if not columns:
+            return None
+        return columns, make(fields)
+
+    def get_representation(self, instance):
+        if not self.camelize_keys:
+            return super().to_representation(instance)
+
+        names = self.camelized_field_names
+        ret = CamelizedDict()
+        for field in self._readable_fields:
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+
+            check_for_none = (
+                attribute.pk if isinstance(attribute, PKOnlyObject)
+                else attribute
+            )
+            if check_for_none is None:
+                ret[names[field.field_name]] = None
+            else:
+                ret[names[field.field_name]] = field.to_representation(attribute)
+        return ret
+
 
 class Serializer(StandardSerializerMixin, serializers.Serializer):
     pass
@@ -27,21 +154,104 @@ class ModelSerializer(StandardSerializerMixin, serializers.ModelSerializer):
     pass
 
 
+_entity_types = {}
+
+
 class EntitySerializerMixin:
+    # Attribute path read as the caption instead of `str(instance)`,
+    # e.g. 'title' or 'author__name'.
+    caption_field = None
+    # Relations loaded with the instances, so captions don't query per row.
+    # Derived from `caption_field` when not set.
+    caption_select_related = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        serializer.instance = cls.prepare_queryset(serializer.instance)
+        return serializer
+
+    @classmethod
+    def get_caption_select_related(cls) -> Tuple[str]:
+        if cls.caption_select_related is not None:
+            return tuple(cls.caption_select_related)
+        if cls.caption_field and '__' in cls.caption_field:
+            return (cls.caption_field.rsplit('__', 1)[0], )
+        return ()
+
+    @classmethod
+    def prepare_queryset(cls, queryset):
+        """
+        Applies `select_related` for captions to a queryset that wasn't
+        evaluated yet. Anything else is returned as is.
+        """
+        if isinstance(queryset, Manager):
+            queryset = queryset.all()
+        related = cls.get_caption_select_related()
+        if (
+            related
+            and isinstance(queryset, QuerySet)
+            and queryset._result_cache is None
+        ):
+            return queryset.select_related(*related)
+        return queryset
+
+    def get_caption(self, instance) -> str:
+        if not self.caption_field:
+            return str(instance)
+        value = instance
+        for attr in self.caption_field.split('__'):
+            value = getattr(value, attr)
+            if value is None:
+                return ''
+        return str(value)
+
+    def get_type(self, instance) -> str:
+        model = type(instance)
+        name = _entity_types.get(model)
+        if name is None:
+            name = _entity_types[model] = model.__name__
+        return name
 
     def to_representation(self, instance):
-        return OrderedDict([
-            ("id", instance.id),
-            ("caption", str(instance)),
-            ("type", instance.__class__.__name__),
-            ("props", super().to_representation(instance)),
-        ])
+        # Entity keys need no case conversion.
+        data = CamelizedDict() if getattr(self, 'camelize_keys', False) else {}
+        data['id'] = instance.id
+        data['caption'] = self.get_caption(instance)
+        data['type'] = self.get_type(instance)
+        data['props'] = super().to_representation(instance)
+        return data
 
 
 class EntityModelSerializer(EntitySerializerMixin, ModelSerializer):
     pass
 
 
+STOCK_REPRESENTATIONS = (
+    StandardSerializerMixin.to_representation,
+    EntitySerializerMixin.to_representation,
+    serializers.Serializer.to_representation,
+    serializers.ListSerializer.to_representation,
+)
+
+
+def has_custom_representation(serializer) -> bool:
+    """
+    Whether the serializer class, or its `Meta.list_serializer_class`,
+    overrides `to_representation` of this package or DRF, so it may read
+    anything from instances.
+    """
+    if type(serializer).to_representation not in STOCK_REPRESENTATIONS:
+        return True
+    list_class = getattr(
+        getattr(serializer, 'Meta', None), 'list_serializer_class', None
+    )
+    return (
+        list_class is not None
+        and list_class.to_representation not in STOCK_REPRESENTATIONS
+    )
+
+
 class NestedListSerializer(serializers.ListSerializer):
     """
     Usage example:
@@ -79,12 +289,29 @@ class NestedListSerializer(serializers.ListSerializer):
     """
 
     delete_key = '_delete'
+    # Group deletes into one query, creates into `bulk_create` and updates
+    # into `bulk_update`. Children overriding `create`/`update`, and items
+    # writing many-to-many or non-field attributes, are saved one by one,
+    # and so are objects of models overriding `delete()` deleted.
+    # Bulk writes skip `save()` and model save signals.
+    bulk = False
+    bulk_batch_size = None
+    # Don't write objects whose loaded fields already match the item,
+    # unless the child overrides `update`.
+    skip_unchanged = True
+    # Load existing objects with only the fields the items write. Turn off
+    # if the child's `update` or model `save()` reads other fields.
+    load_written_only = True
 
     def update(self, objects, data):
-        obj_map = {obj.id: obj for obj in objects}
+        obj_map = self.get_object_map(objects, data)
+        # Counts of the last update, for instrumentation.
+        self.stats = {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
 
         result = []
-        # Perform creations and updates.
+        deletions = []
+        creations = []
+        updates = []
         for item in data:
             pk = item.pop('id', None)
             to_delete = item.pop(self.delete_key, False)
@@ -92,9 +319,185 @@ class NestedListSerializer(serializers.ListSerializer):
 
             if obj:
                 if to_delete:
-                    obj.delete()
+                    deletions.append(obj)
                 else:
-                    result.append(self.child.update(obj, item))
+                    updates.append((len(result), obj, item))
+                    result.append(obj)
             elif not to_delete:
-                result.append(self.child.create(item))
+                creations.append((len(result), item))
+                result.append(None)
+
+        self.perform_deletions(deletions)
+        self.perform_updates(updates, result)
+        self.perform_creations(creations, result)
         return result
+
+    def get_object_map(self, objects, data) -> Dict:
+        """
+        Existing objects referenced by the items, by primary key.
+
+        A queryset that was prefetched already is read from its cache,
+        otherwise only the referenced rows are loaded.
+        """
+        ids = {item['id'] for item in data if item.get('id') is not None}
+        if not ids:
+            return {}
+
+        if isinstance(objects, QuerySet) and objects._result_cache is None:
+            objects = objects.filter(pk__in=ids)
+            fields = self.get_load_fields(objects.model, data)
+            if fields:
+                # Related managers set the instance on the foreign key of
+                # each row, which reads its column.
+                fields.update(
+                    field.name for field in objects._known_related_objects
+                )
+                objects = objects.only(*fields)
+        return {obj.pk: obj for obj in objects if obj.pk in ids}
+
+    def get_load_fields(self, model, data) -> Set[str]:
+        if not self.load_written_only:
+            return set()
+
+        fields = set()
+        for item in data:
+            if item.get('id') is None or item.get(self.delete_key):
+                continue
+            for attr in item:
+                if attr == 'id' or attr == self.delete_key:
+                    continue
+                try:
+                    field = model._meta.get_field(attr)
+                except FieldDoesNotExist:
+                    # Non-field attributes may read anything.
+                    return set()
+                if field.concrete and not field.many_to_many:
+                    fields.add(attr)
+        return fields
+
+    def perform_deletions(self, objects: List):
+        if not objects:
+            return
+        self.stats['deleted'] += len(objects)
+        model = type(objects[0])
+        if self.bulk and model.delete is Model.delete:
+            model._default_manager.filter(
+                pk__in=[obj.pk for obj in objects]
+            ).delete()
+        else:
+            for obj in objects:
+                obj.delete()
+
+    def perform_updates(self, updates: List[Tuple[int, object, Dict]], result: List):
+        bulk_items = []
+        for index, obj, item in updates:
+            # Overridden `update` may do more than saving the item.
+            if self.skip_unchanged and not self.child_overrides('update'):
+                changed = self.get_changed_fields(obj, item)
+                if not changed:
+                    self.stats['unchanged'] += 1
+                    continue
+            else:
+                changed = set(item)
+
+            self.stats['updated'] += 1
+            if self.can_bulk_write('update', item):
+                bulk_items.append((obj, item, changed))
+            else:
+                result[index] = self.child.update(obj, item)
+        if not bulk_items:
+            return
+
+        fields = set()
+        for obj, item, changed in bulk_items:
+            raise_errors_on_nested_writes('update', self.child, item)
+            for attr in changed:
+                setattr(obj, attr, item[attr])
+            fields.update(changed)
+        if fields:
+            objects = [obj for obj, _, _ in bulk_items]
+            type(objects[0])._default_manager.bulk_update(
+                objects, fields, batch_size=self.bulk_batch_size
+            )
+
+    def perform_creations(self, creations: List[Tuple[int, Dict]], result: List):
+        self.stats['created'] += len(creations)
+        bulk_items = []
+        for index, item in creations:
+            if self.can_bulk_write('create', item):
+                bulk_items.append((index, item))
+            else:
+                result[index] = self.child.create(item)
+        if not bulk_items:
+            return
+
+        model = self.child.Meta.model
+        objects = []
+        for index, item in bulk_items:
+            raise_errors_on_nested_writes('create', self.child, item)
+            objects.append(model(**item))
+        model._default_manager.bulk_create(
+            objects, batch_size=self.bulk_batch_size
+        )
+        for (index, _), obj in zip(bulk_items, objects):
+            result[index] = obj
+
+    def get_changed_fields(self, obj, item: Dict) -> Set[str]:
+        """
+        Item keys whose values differ from the loaded object. Keys that
+        aren't concrete fields (many-to-many, properties) always count as
+        changed.
+        """
+        changed = set()
+        for attr, value in item.items():
+            try:
+                field = obj._meta.get_field(attr)
+            except FieldDoesNotExist:
+                changed.add(attr)
+                continue
+
+            if not field.concrete or field.many_to_many:
+                changed.add(attr)
+            elif isinstance(value, File) and not isinstance(value, FieldFile):
+                # Uploads compare equal to stored files by name.
+                changed.add(attr)
+            elif field.is_relation:
+                if isinstance(value, Model):
+                    value = value.pk
+                if getattr(obj, field.attname) != value:
+                    changed.add(attr)
+            elif getattr(obj, attr) != value:
+                changed.add(attr)
+        return changed
+
+    def can_bulk_write(self, method: str, item: Dict) -> bool:
+        """
+        Whether the item can be written in bulk, bypassing child's method.
+        """
+        if not self.bulk or self.child_overrides(method):
+            return False
+
+        fields = self.concrete_field_names
+        return all(attr in fields for attr in item)
+
+    def child_overrides(self, method: str) -> bool:
+        """
+        Whether child's method isn't the plain `ModelSerializer` one.
+        """
+        if not isinstance(self.child, serializers.ModelSerializer):
+            return True
+        return getattr(type(self.child), method) is not getattr(
+            serializers.ModelSerializer, method
+        )
+
+    @cached_property
+    def concrete_field_names(self) -> Set[str]:
+        model = self.child.Meta.model
+        info = model_meta.get_field_info(model)
+        return {
+            *info.fields,
+            *(
+                name for name, relation in info.forward_relations.items()
+                if not relation.to_many
+            ),
+        }
@@ -1,15 +1,41 @@
-from typing import List, Dict
-
-from django.http.response import HttpResponseRedirectBase
-
+from itertools import islice
+import logging
+from typing import List, Dict, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.db.models.query import ModelIterable
+from django.http.response import HttpResponseRedirectBase, StreamingHttpResponse
+
+from rest_framework.exceptions import NotFound
+from rest_framework.metadata import SimpleMetadata
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
 from rest_framework import generics
+from rest_framework import pagination
 from rest_framework import views
 
+from .casing import underscoreize_key
 from .const import VIEW_SCOPES
+from .metadata import FieldsetMetadata
+from .pagination import (
+    KeysetPagination,
+    LimitOffsetPagination,
+    PageNumberPagination,
+    keyset_pagination,
+)
+from .plans import QueryPlan, get_query_plan
+from .renderers import CamelCaseORJSONRenderer
+from .serializers import (
+    EntitySerializerMixin,
+    StandardSerializerMixin,
+    has_custom_representation,
+)
 
 __all__ = (
     'StandardAPIViewMixin',
+    'StandardGenericAPIViewMixin',
     'StandardListAPIViewMixin',
 
     'APIView',
@@ -23,13 +49,48 @@ __all__ = (
     'RetrieveUpdateAPIView',
     'RetrieveDestroyAPIView',
     'RetrieveUpdateDestroyAPIView',
+    'ChoicesAPIView',
 )
 
 
+logger = logging.getLogger('standards.drf.views')
+
+
 class StandardAPIViewMixin:
     action_name = None
     response_messages = None
     scopes = ()
+    # Log the number of queries made by each request. Defaults to
+    # REST_FRAMEWORK['DEBUG_QUERIES']. Queries of streamed responses
+    # run after the view returns and aren't counted.
+    debug_queries = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_debugging_queries():
+            return super().dispatch(request, *args, **kwargs)
+
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            response = super().dispatch(request, *args, **kwargs)
+        logger.info(
+            '%s %s (%s): %d queries',
+            request.method,
+            request.path,
+            type(self).__name__,
+            len(queries),
+        )
+        return response
+
+    def is_debugging_queries(self) -> bool:
+        if self.debug_queries is not None:
+            return self.debug_queries
+        configs = getattr(settings, 'REST_FRAMEWORK', {})
+        return bool(configs.get('DEBUG_QUERIES', False))
 
     def get_response_data(self, response, data) -> Dict:
         result = self._transform_response_data(data)
@@ -96,8 +157,203 @@ class StandardAPIViewMixin:
         return super().finalize_response(request, response, *args, **kwargs)
 
 
-class StandardListAPIViewMixin(StandardAPIViewMixin):
-    pass
+class StandardGenericAPIViewMixin(StandardAPIViewMixin):
+    """
+    Applies `select_related`, `prefetch_related` and `only` to
+    `get_queryset()` of reading requests, as planned from the serializer
+    field tree. Plans are built once per serializer class.
+    """
+    plan_queries = True
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.plan_queries and self.request.method in SAFE_METHODS:
+            queryset = self.apply_query_plan(queryset)
+        return queryset
+
+    def get_query_plan(self, queryset) -> Optional[QueryPlan]:
+        """
+        Override to adjust the plan, or return `None` to skip planning.
+        """
+        return get_query_plan(self.get_serializer(), queryset.model)
+
+    def apply_query_plan(self, queryset):
+        if not isinstance(queryset, QuerySet):
+            return queryset
+        plan = self.get_query_plan(queryset)
+        if plan is None:
+            return queryset
+        return plan.apply(queryset)
+
+
+class StandardListAPIViewMixin(StandardGenericAPIViewMixin):
+    """
+    With `streaming = True` unpaginated lists are written chunk by chunk
+    into a `StreamingHttpResponse`, so memory stays flat for any number
+    of rows, in the same envelope as unstreamed responses (including the
+    pagination block of `LimitOffsetPagination` without a limit).
+    `streaming_format = 'ndjson'` streams one item per line instead.
+    """
+    streaming = False
+    streaming_format = 'json'
+    streaming_chunk_size = 500
+    streaming_renderer_class = CamelCaseORJSONRenderer
+    ndjson_media_type = 'application/x-ndjson'
+    # Serialize `values_list` rows instead of model instances when every
+    # serializer field is a column of the model. `None` detects it for
+    # serializers that don't override `to_representation`, paginated by
+    # this package's offset paginators or not at all. `True` allows it
+    # for others too (the paginator must not read row attributes),
+    # `False` turns it off.
+    values_serialization = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.streaming:
+            streamed = self.get_streaming_queryset(queryset)
+            if streamed is not None:
+                return self.get_streaming_response(streamed, queryset)
+
+        representation = self.get_values_representation(queryset)
+        if representation is not None:
+            return self.list_values(queryset, *representation)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    def get_values_representation(self, queryset):
+        """
+        `(columns, to_representation)` when the queryset can be serialized
+        from `values_list` rows, `None` otherwise.
+        """
+        if self.values_serialization is False:
+            return None
+        if (
+            not isinstance(queryset, QuerySet)
+            or queryset._iterable_class is not ModelIterable
+            or queryset._prefetch_related_lookups
+            or queryset.model is not self.get_serializer_class().Meta.model
+        ):
+            return None
+
+        paginator = self.paginator
+        if (
+            isinstance(paginator, KeysetPagination)
+            or getattr(paginator, 'deferred_join', False)
+        ):
+            return None
+        # Other paginators may read attributes of the page rows.
+        if self.values_serialization is None and not (
+            paginator is None
+            or isinstance(paginator, (LimitOffsetPagination, PageNumberPagination))
+        ):
+            return None
+
+        serializer = self.get_serializer()
+        if (
+            not isinstance(serializer, StandardSerializerMixin)
+            or isinstance(serializer, EntitySerializerMixin)
+        ):
+            return None
+        if (
+            self.values_serialization is None
+            and has_custom_representation(serializer)
+        ):
+            return None
+        return serializer.get_values_representation()
+
+    def list_values(self, queryset, columns: List[str], to_representation):
+        queryset = queryset.values_list(*columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(to_representation(page))
+        return Response(to_representation(queryset))
+
+    def get_streaming_queryset(self, queryset):
+        """
+        Returns queryset to stream, or `None` if the request is paginated.
+        """
+        paginator = self.paginator
+        if paginator is None:
+            return queryset
+        if (
+            isinstance(paginator, pagination.LimitOffsetPagination)
+            and not paginator.get_limit(self.request)
+        ):
+            return queryset[paginator.get_offset(self.request):]
+        return None
+
+    def get_streaming_response(self, queryset, source=None) -> StreamingHttpResponse:
+        """
+        Streams `queryset`, sliced from the filtered `source` queryset.
+        """
+        renderer = self.streaming_renderer_class()
+        context = self.get_renderer_context()
+        if self.streaming_format == 'ndjson':
+            return StreamingHttpResponse(
+                self.stream_ndjson(queryset, renderer, context),
+                content_type=self.ndjson_media_type,
+            )
+        return StreamingHttpResponse(
+            self.stream_json(queryset, renderer, context, source),
+            content_type=renderer.media_type,
+        )
+
+    def get_streaming_chunks(self, queryset) -> Iterator[List]:
+        size = self.streaming_chunk_size
+        if isinstance(queryset, QuerySet):
+            iterator = queryset.iterator(chunk_size=size)
+        else:
+            iterator = iter(queryset)
+        chunk = list(islice(iterator, size))
+        while chunk:
+            yield self.get_serializer(chunk, many=True).data
+            chunk = list(islice(iterator, size))
+
+    def stream_json(self, queryset, renderer, context, source=None) -> Iterable[bytes]:
+        # Same envelope as unstreamed lists, with the pagination block of
+        # this package's offset pagination after the items.
+        paginated = isinstance(self.paginator, LimitOffsetPagination)
+        envelope = renderer.render(
+            self.get_response_data(
+                Response(),
+                {'items': [], 'pagination': {}} if paginated else [],
+            ),
+            renderer.media_type,
+            context,
+        )
+        position = envelope.index(b'"items":[]') + len(b'"items":[')
+
+        yield envelope[:position]
+        streamed = 0
+        for chunk in self.get_streaming_chunks(queryset):
+            content = renderer.render(chunk, renderer.media_type, context)
+            if streamed:
+                yield b','
+            streamed += len(chunk)
+            yield content[1:-1]
+
+        if not paginated:
+            yield envelope[position:]
+            return
+        info = self.paginator.get_streaming_info(
+            queryset if source is None else source, self.request, streamed
+        )
+        end = envelope.index(b'"pagination":{}', position) + len(b'"pagination":')
+        yield envelope[position:end]
+        yield renderer.render(info, renderer.media_type, context)
+        yield envelope[end + len(b'{}'):]
+
+    def stream_ndjson(self, queryset, renderer, context) -> Iterable[bytes]:
+        for chunk in self.get_streaming_chunks(queryset):
+            yield b''.join(
+                renderer.render(item, renderer.media_type, context) + b'\n'
+                for item in chunk
+            )
 
 
 class APIView(StandardAPIViewMixin, views.APIView):
@@ -105,12 +361,12 @@ class APIView(StandardAPIViewMixin, views.APIView):
     scopes = ()
 
 
-class GenericAPIView(StandardAPIViewMixin, generics.GenericAPIView):
+class GenericAPIView(StandardGenericAPIViewMixin, generics.GenericAPIView):
     action_name = 'generic'
     scopes = (VIEW_SCOPES.generic, )
 
 
-class CreateAPIView(StandardAPIViewMixin, generics.CreateAPIView):
+class CreateAPIView(StandardGenericAPIViewMixin, generics.CreateAPIView):
     action_name = 'create'
     scopes = (VIEW_SCOPES.generic, VIEW_SCOPES.create)
 
@@ -120,17 +376,17 @@ class ListAPIView(StandardListAPIViewMixin, generics.ListAPIView):
     scopes = (VIEW_SCOPES.generic, VIEW_SCOPES.list)
 
 
-class RetrieveAPIView(StandardAPIViewMixin, generics.RetrieveAPIView):
+class RetrieveAPIView(StandardGenericAPIViewMixin, generics.RetrieveAPIView):
     action_name = 'receive'
     scopes = (VIEW_SCOPES.generic, VIEW_SCOPES.receive)
 
 
-class DestroyAPIView(StandardAPIViewMixin, generics.DestroyAPIView):
+class DestroyAPIView(StandardGenericAPIViewMixin, generics.DestroyAPIView):
     action_name = 'remove'
     scopes = (VIEW_SCOPES.generic, VIEW_SCOPES.remove)
 
 
-class UpdateAPIView(StandardAPIViewMixin, generics.UpdateAPIView):
+class UpdateAPIView(StandardGenericAPIViewMixin, generics.UpdateAPIView):
     action_name = 'update'
     scopes = (VIEW_SCOPES.generic, VIEW_SCOPES.update)
 
@@ -144,7 +400,7 @@ class ListCreateAPIView(
 
 
 class RetrieveUpdateAPIView(
-    StandardAPIViewMixin,
+    StandardGenericAPIViewMixin,
     generics.RetrieveUpdateAPIView
 ):
     action_name = 'receive_update'
@@ -152,7 +408,7 @@ class RetrieveUpdateAPIView(
 
 
 class RetrieveDestroyAPIView(
-    StandardAPIViewMixin,
+    StandardGenericAPIViewMixin,
     generics.RetrieveDestroyAPIView
 ):
     action_name = 'receive_remove'
@@ -160,7 +416,7 @@ class RetrieveDestroyAPIView(
 
 
 class RetrieveUpdateDestroyAPIView(
-    StandardAPIViewMixin,
+    StandardGenericAPIViewMixin,
     generics.RetrieveUpdateDestroyAPIView
 ):
     action_name = 'receive_update_remove'
@@ -170,3 +426,124 @@ class RetrieveUpdateDestroyAPIView(
         VIEW_SCOPES.update,
         VIEW_SCOPES.remove,
     )
+
+
+class ChoicesAPIView(StandardAPIViewMixin, generics.GenericAPIView):
+    """
+    Choices of a serializer field or filter of `target_view`, with search
+    and keyset pagination, in the format of FieldsetMetadata choices.
+    Labels and extras follow the target view's `label_meta_choices` and
+    `extra_meta_choices`. Meant to be referenced by `remote_meta_choices`:
+
+    path(
+        'some/choices/<str:field>/',
+        ChoicesAPIView.as_view(target_view=SomeView),
+    )
+    """
+    action_name = 'choices'
+    scopes = (VIEW_SCOPES.generic, VIEW_SCOPES.list)
+    target_view = None
+    field_url_kwarg = 'field'
+    metadata_class = SimpleMetadata
+    search_param = 'search'
+    # Searched when the target view declares no label field.
+    search_fields = ()
+    pagination_class = keyset_pagination(
+        100,
+        ordering='pk',
+        page_size_query_param='page_size',
+        max_page_size=1000,
+    )
+
+    def get(self, request, *args, **kwargs):
+        queryset, source = self.get_choices_queryset()
+        queryset = self.search_queryset(queryset, source)
+        metadata = self.get_metadata()
+        queryset = metadata.prepare_choices_queryset(queryset, source)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                metadata.serialize_choices(page, source)
+            )
+        return Response(metadata.serialize_choices(queryset, source))
+
+    def check_permissions(self, request):
+        super().check_permissions(request)
+        self.get_target_view().check_permissions(request)
+
+    def get_target_view(self):
+        target = getattr(self, '_target_view', None)
+        if target is None:
+            assert self.target_view is not None, (
+                f'{type(self).__name__} should set `target_view`'
+            )
+            target = self._target_view = self.target_view()
+            target.request = self.request
+            target.args = self.args
+            target.kwargs = {
+                key: value for key, value in self.kwargs.items()
+                if key != self.field_url_kwarg
+            }
+            target.format_kwarg = None
+        return target
+
+    def get_metadata(self) -> FieldsetMetadata:
+        target = self.get_target_view()
+        metadata_class = getattr(target, 'metadata_class', None)
+        if not (
+            isinstance(metadata_class, type)
+            and issubclass(metadata_class, FieldsetMetadata)
+        ):
+            metadata_class = FieldsetMetadata
+        metadata = metadata_class()
+        metadata.view = target
+        return metadata
+
+    def get_choices_queryset(self):
+        """
+        Choices queryset of the requested field or filter and its source,
+        the key of the target view's choice declarations.
+        """
+        target = self.get_target_view()
+        metadata = self.get_metadata()
+        name = self.kwargs.get(self.field_url_kwarg)
+        names = (name, underscoreize_key(name))
+
+        if hasattr(target, 'get_serializer'):
+            fields = target.get_serializer().fields
+            for key in names:
+                field = fields.get(key)
+                if field is not None and not field.read_only:
+                    queryset = metadata.get_field_queryset(field)
+                    if queryset is not None:
+                        return queryset.all(), field.source
+
+        if getattr(target, 'filterset_class', None) is not None:
+            filters = target.filterset_class(
+                data=self.request.GET,
+                request=self.request,
+                queryset=target.get_queryset(),
+            ).filters
+            for key in names:
+                if key in filters:
+                    queryset = metadata.get_filter_queryset(
+                        filters[key], self.request
+                    )
+                    if queryset is not None:
+                        return queryset.all(), key
+        raise NotFound()
+
+    def search_queryset(self, queryset, source: str):
+        term = self.request.query_params.get(self.search_param)
+        if not term:
+            return queryset
+        label_field = getattr(
+            self.get_target_view(), 'label_meta_choices', {}
+        ).get(source)
+        fields = (label_field, ) if label_field else self.search_fields
+        if not fields:
+            return queryset
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__icontains': term})
+        return queryset.filter(condition)